@@ -0,0 +1,290 @@
+# library initialization
+import random
+import numpy as np
+
+from snake import (dis_width, dis_height, snake_block, grid_margin, speed, foodDicts, cross_probe, corners_probe, food_probe,
+                   inside_circle_radius, outside_circle_radius, police_turbo, police_best_move, police_random_weights, police_max_attempts,
+                   police_spawn_clearance,
+                   obstacle_grid, pattern)
+
+# actions understood by the batched engine, the index of an action being its code in the actions array
+batch_actions = (None, "up", "down", "left", "right")
+no_action, action_up, action_down, action_left, action_right = range(len(batch_actions))
+
+# food types are stored as codes, in the order of foodDicts
+food_types = list(foodDicts.keys())
+food_weights = [0.6, 0.3, 0.1]
+food_double = food_types.index("double")
+
+# probes as arrays of offsets, so that they can be broadcast against every game at once
+cross_offsets = np.array(cross_probe)
+corners_offsets = np.array(corners_probe)
+food_offsets = np.array(food_probe)
+police_corners = np.array([[-snake_block, -snake_block], [snake_block, -snake_block], [-snake_block, snake_block], [snake_block, snake_block]])
+
+class batch_game():
+    """
+    class responsible for running many games in lockstep, for AI training and difficulty tuning
+    every game lives in struct-of-arrays form (heads, directions, lengths, bodies, police and food are numpy arrays
+    indexed by game) so that a single call to step advances all of them with a handful of vectorized operations
+    the rules are the ones of game_state.step: position_update, builder, the cop's direction_algorithm and capture check,
+    is_breaching, the obstacle and tail checks and ate_food (the fast food accelerators only change the frame rate,
+    which has no meaning here, so they are not tracked)
+    like in game_state, the food and the cops are never placed on the snake, and the cops never within
+    police_spawn_clearance cells of its head
+    to keep memory in check, games share a pool of n_layouts obstacle grids generated by the regular pattern class
+    """
+
+    def __init__(self, n_games, difficulty, police_chase=False, n_layouts=None, seed=None):
+        self.n_games = n_games
+        self.difficulty = difficulty
+        self.police_chase = police_chase
+        self.rng = np.random.default_rng(seed)
+
+        # obstacle grids, each game pointing to one of the layouts
+        self.n_layouts = n_layouts if n_layouts is not None else min(n_games, 16)
+        self.layouts = np.zeros((self.n_layouts, dis_width + 2 * grid_margin, dis_height + 2 * grid_margin), dtype=bool)
+        for layout in range(self.n_layouts):
+            our_grid = obstacle_grid(dis_width, dis_height)
+            level_rng = random.Random(int(self.rng.integers(2**63)))
+            pattern(difficulty=difficulty, dis_width=dis_width, dis_height=dis_height, snake_block=snake_block, borders=our_grid, rng=level_rng).build_pattern()
+            self.layouts[layout] = our_grid.cells
+        self.layout = np.arange(n_games) % self.n_layouts
+
+        # snake arrays, the body being a ring buffer per game (start index and count of segments)
+        self.x_coord = np.zeros(n_games, dtype=np.int64)
+        self.y_coord = np.zeros(n_games, dtype=np.int64)
+        self.x_shift = np.zeros(n_games, dtype=np.int64)
+        self.y_shift = np.zeros(n_games, dtype=np.int64)
+        self.length = np.ones(n_games, dtype=np.int64)
+        self.body = np.zeros((n_games, 64, 2), dtype=np.int16)
+        self.body_start = np.zeros(n_games, dtype=np.int64)
+        self.body_count = np.zeros(n_games, dtype=np.int64)
+
+        # food arrays
+        self.food_x = np.zeros(n_games, dtype=np.int64)
+        self.food_y = np.zeros(n_games, dtype=np.int64)
+        self.food_type = np.zeros(n_games, dtype=np.int64)
+
+        # police arrays (the cop moves by police_turbo blocks, hence float coordinates)
+        self.police_x = np.zeros(n_games)
+        self.police_y = np.zeros(n_games)
+        self.police_x_shift = np.zeros(n_games)
+        self.police_y_shift = np.zeros(n_games)
+
+        # game management arrays
+        self.key_pressed = np.zeros(n_games, dtype=bool)
+        self.game_close = np.zeros(n_games, dtype=bool)
+        self.ticks = np.zeros(n_games, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, games=None):
+        """
+        restarts the given games (all of them by default) on their layout, with a fresh food and cop position
+        """
+
+        games = np.arange(self.n_games) if games is None else np.asarray(games)
+
+        self.x_coord[games] = dis_width // 2
+        self.y_coord[games] = dis_height // 2
+        self.x_shift[games] = 0
+        self.y_shift[games] = 0
+        self.length[games] = 1
+        self.body_start[games] = 0
+        self.body_count[games] = 0
+        self.key_pressed[games] = False
+        self.game_close[games] = False
+        self.ticks[games] = 0
+
+        self.generate_food(games)
+        if self.police_chase:
+            self.set_police_coordinates(games)
+            self.police_x_shift[games] = 0
+            self.police_y_shift[games] = 0
+
+    def scores(self):
+        return self.length - 1
+
+    def snake_speed(self):
+        return speed[self.difficulty]
+
+    def any_blocked(self, games, x_coords, y_coords, offsets):
+        """
+        vectorized neighbourhood probe: for every game, is one of the offsets around its position part of an obstacle
+        """
+
+        x_cells = np.rint(x_coords).astype(np.int64)[:, None] + offsets[None, :, 0] + grid_margin
+        y_cells = np.rint(y_coords).astype(np.int64)[:, None] + offsets[None, :, 1] + grid_margin
+        inside = (x_cells >= 0) & (x_cells < self.layouts.shape[1]) & (y_cells >= 0) & (y_cells < self.layouts.shape[2])
+
+        layouts = np.broadcast_to(self.layout[games][:, None], x_cells.shape)
+        blocked = np.zeros(x_cells.shape, dtype=bool)
+        blocked[inside] = self.layouts[layouts[inside], x_cells[inside], y_cells[inside]]
+        return blocked.any(axis=1)
+
+    def on_snake(self, games, x_coords, y_coords, clearance=0):
+        """
+        vectorized body probe: for every game, does the position overlap a segment of its snake or lie within clearance
+        cells of its head on both axes (across the edges of the screen, like the snake wraps around them)
+        """
+
+        x_gaps = np.abs(self.body[games, :, 0] - x_coords[:, None])
+        y_gaps = np.abs(self.body[games, :, 1] - y_coords[:, None])
+        covered = ((x_gaps < snake_block) & (y_gaps < snake_block) & self.body_mask(games)).any(axis=1)
+
+        x_gaps = np.abs(self.x_coord[games] - x_coords) % dis_width
+        y_gaps = np.abs(self.y_coord[games] - y_coords) % dis_height
+        reach = (clearance + 1) * snake_block
+        near = (np.minimum(x_gaps, dis_width - x_gaps) < reach) & (np.minimum(y_gaps, dis_height - y_gaps) < reach)
+        return covered | near
+
+    def random_cells(self, count):
+        # same distribution as round(random.randrange(0, dis_width - snake_block) / 10.0) * 10.0
+        x_coords = np.round(self.rng.integers(0, dis_width - snake_block, count) / 10.0).astype(np.int64) * 10
+        y_coords = np.round(self.rng.integers(0, dis_height - snake_block, count) / 10.0).astype(np.int64) * 10
+        return x_coords, y_coords
+
+    def generate_food(self, games):
+        pending = np.asarray(games)
+        while pending.size > 0:
+            x_coords, y_coords = self.random_cells(pending.size)
+            legal = ~self.any_blocked(pending, x_coords, y_coords, food_offsets) & ~self.on_snake(pending, x_coords, y_coords)
+            self.food_x[pending[legal]] = x_coords[legal]
+            self.food_y[pending[legal]] = y_coords[legal]
+            pending = pending[~legal]
+
+        self.food_type[games] = self.rng.choice(len(food_types), np.size(games), p=food_weights)
+
+    def set_police_coordinates(self, games):
+        pending = np.asarray(games)
+        while pending.size > 0:
+            x_coords, y_coords = self.random_cells(pending.size)
+            legal = ~self.any_blocked(pending, x_coords, y_coords, cross_offsets) & ~self.on_snake(pending, x_coords, y_coords, police_spawn_clearance)
+            self.police_x[pending[legal]] = x_coords[legal]
+            self.police_y[pending[legal]] = y_coords[legal]
+            pending = pending[~legal]
+
+    def grow_body(self, capacity):
+        # the ring buffers are unrolled in order into a larger array
+        order = (self.body_start[:, None] + np.arange(self.body.shape[1])[None, :]) % self.body.shape[1]
+        body = np.zeros((self.n_games, capacity, 2), dtype=self.body.dtype)
+        body[:, :self.body.shape[1]] = np.take_along_axis(self.body, order[:, :, None], axis=1)
+        self.body = body
+        self.body_start[:] = 0
+
+    def body_mask(self, games, exclude_last=False):
+        # which slots of the ring buffers of the given games hold a segment
+        capacity = self.body.shape[1]
+        position = (np.arange(capacity)[None, :] - self.body_start[games][:, None]) % capacity
+        count = self.body_count[games] - (1 if exclude_last else 0)
+        return position < count[:, None]
+
+    def police_step(self, games):
+        """
+        vectorized police.direction_algorithm: a best move (the one minimizing the distance to the snake) or a random move
+        is drawn for every cop, and cops whose move would touch an obstacle have their shift canceled and draw again
+        """
+
+        boost = police_turbo * snake_block
+        pending = games
+        for attempt in range(police_max_attempts):
+            if pending.size == 0: break
+
+            # best move: distance from each of the four candidate cells to the snake, the last minimum winning like in best_move
+            x_coords = self.police_x[pending]
+            y_coords = self.police_y[pending]
+            x_candidates = x_coords[:, None] + np.array([0, 0, -snake_block, snake_block])[None, :]
+            y_candidates = y_coords[:, None] + np.array([-snake_block, snake_block, 0, 0])[None, :]
+            distances = (x_candidates - self.x_coord[pending][:, None])**2 + (y_candidates - self.y_coord[pending][:, None])**2
+            best = 3 - np.argmin(distances[:, ::-1], axis=1)
+
+            # random move: up, down, right, left or nothing (keep the current shift)
+            random_move = self.rng.choice(5, pending.size, p=police_random_weights)
+            random_move = np.array([0, 1, 3, 2, 4])[random_move]
+
+            move = np.where(self.rng.random(pending.size) < police_best_move, best, random_move)
+            x_shift = np.array([0, 0, -boost, boost, 0])[move]
+            y_shift = np.array([-boost, boost, 0, 0, 0])[move]
+            self.police_x_shift[pending] = np.where(move == 4, self.police_x_shift[pending], x_shift)
+            self.police_y_shift[pending] = np.where(move == 4, self.police_y_shift[pending], y_shift)
+
+            # is_close_to_obstacles: blocked cops stop and retry
+            blocked = self.any_blocked(pending, self.police_x[pending] + self.police_x_shift[pending], self.police_y[pending] + self.police_y_shift[pending], corners_offsets)
+            moving = pending[~blocked]
+            self.police_x[moving] += self.police_x_shift[moving]
+            self.police_y[moving] += self.police_y_shift[moving]
+
+            pending = pending[blocked]
+            self.police_x_shift[pending] = 0
+            self.police_y_shift[pending] = 0
+
+    def is_hitting_snake(self, games):
+        # squared distances from every corner of every cop to every segment of its snake, against the hitbox radius
+        snake_hitbox_radius = 0.8 * inside_circle_radius + 0.2 * outside_circle_radius
+        x_corners = self.police_x[games][:, None] + police_corners[None, :, 0]
+        y_corners = self.police_y[games][:, None] + police_corners[None, :, 1]
+        x_blocks = self.body[games, :, 0]
+        y_blocks = self.body[games, :, 1]
+
+        distances = (x_corners[:, :, None] - x_blocks[:, None, :])**2 + (y_corners[:, :, None] - y_blocks[:, None, :])**2
+        hit = (distances < snake_hitbox_radius**2).any(axis=1)
+        return (hit & self.body_mask(games)).any(axis=1)
+
+    def step(self, actions):
+        """
+        advances every running game by one tick, actions being an array of action codes (see batch_actions)
+        lost games are frozen until reset, returns the score earned by each game during the tick and the lost games
+        """
+
+        actions = np.asarray(actions)
+        games = np.flatnonzero(~self.game_close)
+        scores = self.scores()
+
+        # we move our snakes following the actions (if any)
+        act = actions[games]
+        self.key_pressed[games] |= act != no_action
+        self.x_shift[games] = np.select([act == action_left, act == action_right, (act == action_up) | (act == action_down)], [-snake_block, snake_block, 0], self.x_shift[games])
+        self.y_shift[games] = np.select([act == action_up, act == action_down, (act == action_left) | (act == action_right)], [-snake_block, snake_block, 0], self.y_shift[games])
+        self.x_coord[games] += self.x_shift[games]
+        self.y_coord[games] += self.y_shift[games]
+
+        # builds the snakes: the head is pushed at the end of the ring buffer and the tail dropped if too long
+        while self.length[games].max(initial=0) >= self.body.shape[1]: self.grow_body(2 * self.body.shape[1])
+        capacity = self.body.shape[1]
+        slots = (self.body_start[games] + self.body_count[games]) % capacity
+        self.body[games, slots, 0] = self.x_coord[games]
+        self.body[games, slots, 1] = self.y_coord[games]
+        self.body_count[games] += 1
+        trimmed = games[self.body_count[games] > self.length[games]]
+        self.body_start[trimmed] = (self.body_start[trimmed] + 1) % capacity
+        self.body_count[trimmed] -= 1
+
+        # moves the cops (once the player pressed a key) and checks if they captured the snakes
+        if self.police_chase:
+            self.police_step(games[self.key_pressed[games]])
+            self.game_close[games[self.is_hitting_snake(games)]] = True
+
+        # handling the ability to go the opposite side when hitting the wall
+        self.x_coord[games] = np.where(self.x_coord[games] >= dis_width, 0, np.where(self.x_coord[games] < 0, dis_width, self.x_coord[games]))
+        self.y_coord[games] = np.where(self.y_coord[games] >= dis_height, 0, np.where(self.y_coord[games] < 0, dis_height, self.y_coord[games]))
+        if self.police_chase:
+            self.police_x[games] = np.where(self.police_x[games] >= dis_width, 0, np.where(self.police_x[games] < 0, dis_width, self.police_x[games]))
+            self.police_y[games] = np.where(self.police_y[games] >= dis_height, 0, np.where(self.police_y[games] < 0, dis_height, self.police_y[games]))
+
+        # handles illegal wall touches
+        self.game_close[games[self.any_blocked(games, self.x_coord[games], self.y_coord[games], cross_offsets)]] = True
+
+        # handles touching its tail (every segment but the last one pushed)
+        x_heads = self.x_coord[games][:, None]
+        y_heads = self.y_coord[games][:, None]
+        on_body = (self.body[games, :, 0] == x_heads) & (self.body[games, :, 1] == y_heads) & self.body_mask(games, exclude_last=True)
+        self.game_close[games[on_body.any(axis=1)]] = True
+
+        # eaten food handler
+        eating = games[(self.x_coord[games] == self.food_x[games]) & (self.y_coord[games] == self.food_y[games])]
+        self.length[eating] += np.where(self.food_type[eating] == food_double, 2, 1)
+        self.generate_food(eating)
+
+        self.ticks[games] += 1
+        return self.scores() - scores, self.game_close.copy()
@@ -0,0 +1,339 @@
+# library initialization
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import numpy as np
+
+# the benchmarks never need a window, the frames being drawn on a dummy display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import snake
+
+# every benchmark is timed over `repeat` runs of `number` calls, the median time of one call being the figure compared
+default_repeat = 7
+default_threshold = 0.15 # relative slowdown beyond which a benchmark is flagged as a regression
+bench_seed = 2023
+snake_lengths = [10, 1000, 100000]
+crowded_ratios = [0.9, 0.99] # share of the free cells covered by the snake when the food is generated
+probe_positions = 1000 # random positions tested per call of the collision benchmarks
+swarm_sizes = [100, 500]
+world_sizes = [2, 32] # chunks per side of the large worlds, whose frames should cost the same
+
+# cold start of the game, each script being run by a new interpreter, and the time (in microseconds, the interpreter's own
+# start included) it must stay within whatever the baseline
+startup_scripts = {"import": "import snake", "first menu frame": "import snake; snake.init_display(); snake.menu_scene().frame([])"}
+startup_budgets = {"startup[import]": 400000, "startup[first menu frame]": 500000}
+
+# the ticks of a game under way should not keep anything they allocate, the memory they hold once `allocation_ticks`
+# ticks are run (after `allocation_warmup` ones) having to stay within `allocation_budget` bytes of what it was before
+# and the memory a single step allocates at once, even if freed before it returns, staying within `allocation_tick_budget`
+# the swarms and the pathfinding cop are left out, their searches building numpy temporaries of a size varying per tick
+allocation_warmup = 500
+allocation_ticks = 5000
+allocation_budget = 4096
+allocation_tick_budget = 1536
+
+def measure(function, number, repeat=default_repeat):
+    """
+    times `repeat` runs of `number` calls of the function, returns the median and the best time of one call in microseconds
+    """
+
+    timings = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        for call in range(number): function()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+
+    return float(np.median(timings)), float(min(timings))
+
+def new_game(difficulty, police_chase=False, n_police=1, world_chunks=None, police_mode="greedy"):
+    # a seeded game, so that every run of the suite measures the same level
+    return snake.game_state(difficulty=difficulty, police_chase=police_chase, police_mode=police_mode, seed=bench_seed, n_police=n_police, world_chunks=world_chunks)
+
+def level_grid(difficulty):
+    # the obstacles of the seeded games, on a grid of their own
+    grid = snake.obstacle_grid(snake.dis_width, snake.dis_height)
+    snake.generate_level(difficulty, bench_seed).copy_to(grid)
+    return grid
+
+def random_positions(count):
+    # positions on the snake_block cells of the screen, drawn with a seeded generator
+    generator = np.random.default_rng(bench_seed)
+    x_coords = generator.integers(0, snake.dis_width // snake.snake_block, count) * snake.snake_block
+    y_coords = generator.integers(0, snake.dis_height // snake.snake_block, count) * snake.snake_block
+    return list(zip(x_coords.tolist(), y_coords.tolist()))
+
+def bench_build_pattern(difficulty):
+    grid = snake.obstacle_grid(snake.dis_width, snake.dis_height)
+    our_pattern = snake.pattern(difficulty=difficulty, dis_width=snake.dis_width, dis_height=snake.dis_height, snake_block=snake.snake_block, borders=grid, rng=random.Random(bench_seed))
+    return our_pattern.build_pattern, 20
+
+def bench_is_hitting_obstacle(difficulty):
+    our_game = new_game(difficulty)
+    our_snake = our_game.snake
+    positions = random_positions(probe_positions)
+
+    def run():
+        for our_snake.x_coord, our_snake.y_coord in positions: our_snake.is_hitting_obstacle(our_game.borders)
+
+    return run, 5, probe_positions
+
+def bench_is_close_to_obstacles(difficulty):
+    grid = level_grid(difficulty)
+    our_police = snake.police()
+    our_police.x_shift = snake.police_turbo * snake.snake_block
+    positions = random_positions(probe_positions)
+
+    def run():
+        for our_police.x_coord, our_police.y_coord in positions: our_police.is_close_to_obstacles(grid)
+
+    return run, 5, probe_positions
+
+def bench_is_hitting_snake(length):
+    # a body of `length` squares wandering on the screen, the cop standing away from its last squares
+    body = snake.body_buffer()
+    x_coord, y_coord = snake.dis_width / 2, snake.dis_height / 2
+    generator = random.Random(bench_seed)
+    for square in range(length):
+        x_shift, y_shift = generator.choice(snake.cross_probe)
+        x_coord = (x_coord + x_shift) % snake.dis_width
+        y_coord = (y_coord + y_shift) % snake.dis_height
+        body.push(x_coord, y_coord, length)
+
+    our_police = snake.police()
+    our_police.x_coord, our_police.y_coord = (x_coord + snake.dis_width / 2) % snake.dis_width, (y_coord + snake.dis_height / 2) % snake.dis_height
+    return lambda: our_police.is_hitting_snake(snake_surface=body), max(10, 100000 // length)
+
+def bench_food_generate(ratio):
+    # the snake covers the given share of the cells where the food can appear
+    spawns = snake.spawn_index(level_grid("hard"), snake.food_probe)
+    covered = round(spawns.size * ratio)
+    for cell in spawns.cells[:covered].tolist():
+        column, row = divmod(cell, spawns.rows)
+        spawns.occupy(column * snake.snake_block, row * snake.snake_block)
+
+    our_food = snake.food(snake_speed=snake.speed["hard"])
+    food_rng = random.Random(bench_seed)
+    return lambda: our_food.generate(spawns, food_rng), 10000
+
+def start_game(difficulty, police_mode="greedy", drawn=False):
+    # closed right away like a game played from the menu, so that the next one takes its buffers from the pools, and
+    # with the background of its renderer printed when drawn
+    our_game = new_game(difficulty, police_chase=True, police_mode=police_mode)
+    if drawn: snake.new_renderer(our_game, "dirty")
+    our_game.close()
+
+def bench_game_start(difficulty, police_mode="greedy", drawn=False):
+    if drawn and snake.dis is None: snake.init_display()
+    return lambda: start_game(difficulty, police_mode, drawn), 20
+
+def bench_game_restart(difficulty, drawn=False):
+    # a game starting on a level already prepared by the level cache, as when the player restarts
+    if drawn and snake.dis is None: snake.init_display()
+    our_cache = snake.level_cache(directory=None)
+    our_cache.load(difficulty, bench_seed)
+
+    def run():
+        snake.cached_levels = our_cache
+        try: start_game(difficulty, drawn=drawn)
+        finally: snake.cached_levels = None
+
+    return run, 20
+
+def frame_game(difficulty, police_chase, n_police=1, world_chunks=None, police_mode="greedy"):
+    # a game driven by the cautious headless policy, kept running even once lost (every rule is still applied) so that
+    # the frames measured are not mixed with the start of new games
+    our_game = new_game(difficulty, police_chase, n_police, world_chunks, police_mode)
+    policy = snake.cautious_policy(bench_seed)
+    return our_game, lambda: our_game.step(policy(our_game))
+
+def bench_frame_step(difficulty, police_chase, n_police=1, police_mode="greedy"):
+    our_game, tick = frame_game(difficulty, police_chase, n_police, police_mode=police_mode)
+    return tick, 2000 // n_police + 100
+
+def bench_snapshot(operation):
+    # a snapshot of a game with the pathfinding cop taken, or restored, once the game is under way and while a search of
+    # its distance field is in progress (the search being copied by every snapshot)
+    our_game = new_game("hard", police_chase=True, police_mode="pathfinding")
+    policy = snake.cautious_policy(bench_seed)
+    for tick in range(100): our_game.step(policy(our_game))
+    while not our_game.field.queue: our_game.step(policy(our_game))
+    our_snapshot = our_game.clone()
+    return (our_game.clone if operation == "clone" else lambda: our_game.restore(our_snapshot)), 2000
+
+def bench_frame_draw(difficulty, police_chase, mode, world_chunks=None):
+    # one tick and one frame drawn
+    if snake.dis is None: snake.init_display()
+    our_game, tick = frame_game(difficulty, police_chase, world_chunks=world_chunks)
+    our_renderer = snake.new_renderer(our_game, mode)
+    our_renderer.draw()
+
+    def frame():
+        tick()
+        our_renderer.draw()
+
+    return frame, 500
+
+def bench_startup(script):
+    command = [sys.executable, "-c", script]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run(command, cwd=directory, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL), 1
+
+def check_allocations(pattern=None, budget=allocation_budget, tick_budget=allocation_tick_budget):
+    """
+    traces the memory allocated by the ticks of a game with tracemalloc, returns the names of the cases holding more than
+    the budget once their ticks are run, or whose steps allocate more than the tick budget at their peak
+    the peak is taken anew for every step, the policy choosing the action being left out of it
+    """
+
+    over = []
+    for police_chase in (False, True):
+        name = f"allocations[hard, {'police' if police_chase else 'solo'}]"
+        if pattern is not None and pattern not in name: continue
+
+        our_game = new_game("hard", police_chase)
+        policy = snake.cautious_policy(bench_seed)
+        for warmup in range(allocation_warmup): our_game.step(policy(our_game))
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            tick_peak = 0
+            for our_tick in range(allocation_ticks):
+                action = policy(our_game)
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                our_game.step(action)
+                tick_peak = max(tick_peak, tracemalloc.get_traced_memory()[1] - before)
+            gc.collect()
+            current = tracemalloc.get_traced_memory()[0]
+        finally: tracemalloc.stop()
+
+        failed = current - start > budget or tick_peak > tick_budget
+        if failed: over.append(name)
+        print(f"{name:45} {current - start:12d} bytes held after {allocation_ticks} ticks, {tick_peak} bytes at the peak of a step {'OVER BUDGET' if failed else ''}")
+
+    return over
+
+def benchmarks():
+    """
+    the suite, as a list of (name, builder) pairs, a builder returning the function timed, its number of calls per run
+    and optionally the number of operations done by one call (the figure reported being the time of one operation)
+    """
+
+    suite = []
+    for name, script in startup_scripts.items():
+        suite.append((f"startup[{name}]", lambda script=script: bench_startup(script)))
+    for difficulty in snake.speed:
+        suite.append((f"build_pattern[{difficulty}]", lambda difficulty=difficulty: bench_build_pattern(difficulty)))
+    for difficulty in snake.speed:
+        suite.append((f"game_start[{difficulty}]", lambda difficulty=difficulty: bench_game_start(difficulty)))
+        suite.append((f"game_restart[{difficulty}, cached level]", lambda difficulty=difficulty: bench_game_restart(difficulty)))
+    suite.append(("game_start[hard, drawn]", lambda: bench_game_start("hard", drawn=True)))
+    suite.append(("game_restart[hard, cached level, drawn]", lambda: bench_game_restart("hard", drawn=True)))
+    suite.append(("game_start[hard, pathfinding cop]", lambda: bench_game_start("hard", police_mode="pathfinding")))
+    for difficulty in snake.speed:
+        suite.append((f"is_hitting_obstacle[{difficulty}]", lambda difficulty=difficulty: bench_is_hitting_obstacle(difficulty)))
+        suite.append((f"is_close_to_obstacles[{difficulty}]", lambda difficulty=difficulty: bench_is_close_to_obstacles(difficulty)))
+    for length in snake_lengths:
+        suite.append((f"is_hitting_snake[{length}]", lambda length=length: bench_is_hitting_snake(length)))
+    for ratio in crowded_ratios:
+        suite.append((f"food_generate[{ratio:.0%} covered]", lambda ratio=ratio: bench_food_generate(ratio)))
+    for police_chase in (False, True):
+        chase = "police" if police_chase else "solo"
+        suite.append((f"frame_step[hard, {chase}]", lambda police_chase=police_chase: bench_frame_step("hard", police_chase)))
+        for mode in snake.render_modes:
+            suite.append((f"frame_draw[hard, {chase}, {mode}]", lambda police_chase=police_chase, mode=mode: bench_frame_draw("hard", police_chase, mode)))
+    suite.append(("frame_step[hard, pathfinding cop]", lambda: bench_frame_step("hard", True, police_mode="pathfinding")))
+    for operation in ("clone", "restore"):
+        suite.append((f"snapshot[{operation}]", lambda operation=operation: bench_snapshot(operation)))
+    for n_police in swarm_sizes:
+        suite.append((f"frame_step[hard, swarm of {n_police}]", lambda n_police=n_police: bench_frame_step("hard", True, n_police)))
+    for size in world_sizes:
+        suite.append((f"frame_draw[hard, police, world of {size}x{size}]", lambda size=size: bench_frame_draw("hard", True, "full", (size, size))))
+
+    return suite
+
+def run_suite(pattern=None, repeat=default_repeat):
+    results = {}
+    for name, builder in benchmarks():
+        if pattern is not None and pattern not in name: continue
+
+        built = builder()
+        function, number = built[0], built[1]
+        operations = built[2] if len(built) > 2 else 1
+        median, best = measure(function, number, repeat)
+        results[name] = {"us_per_op": median / operations, "best_us_per_op": best / operations, "ops_per_s": operations * 1e6 / median}
+        print(f"{name:45} {median / operations:12.3f} us/op {operations * 1e6 / median:14.0f} ops/s")
+
+    return results
+
+def check_budgets(results, budgets=startup_budgets):
+    """
+    returns the names of the benchmarks slower than their budget
+    """
+
+    over = []
+    for name, budget in budgets.items():
+        if name not in results: continue
+
+        if results[name]["us_per_op"] > budget: over.append(name)
+        print(f"{name:45} {results[name]['us_per_op']:12.0f} us for a budget of {budget:.0f} us {'OVER BUDGET' if results[name]['us_per_op'] > budget else ''}")
+
+    return over
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "pygame": pygame.version.ver, "platform": platform.platform(),
+            "machine": platform.machine(), "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(results, baseline, threshold=default_threshold):
+    """
+    compares the results to a baseline, returns the names of the benchmarks slower than the baseline by more than the threshold
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline: continue
+
+        ratio = result["us_per_op"] / baseline[name]["us_per_op"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ("improved" if ratio < 1 - threshold else "")
+        if ratio > 1 + threshold: regressions.append(name)
+        print(f"{name:45} {baseline[name]['us_per_op']:12.3f} -> {result['us_per_op']:12.3f} us/op ({ratio:5.2f}x) {flag}")
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the snake game, run headless")
+    parser.add_argument("--filter", default=None, help="only run the benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=default_repeat, help="number of timed runs of each benchmark")
+    parser.add_argument("--output", default=None, help="JSON file where the results are written")
+    parser.add_argument("--compare", default=None, help="baseline JSON file the results are compared to")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="relative slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    results = run_suite(pattern=args.filter, repeat=args.repeat)
+    print()
+    over = check_budgets(results)
+    print()
+    over += check_allocations(pattern=args.filter)
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file: json.dump({"environment": environment(), "results": results}, output_file, indent=2)
+
+    regressions = []
+    if args.compare is not None:
+        with open(args.compare) as baseline_file: baseline = json.load(baseline_file)["results"]
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions: print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+
+    if over: print(f"{len(over)} benchmark(s) over budget: {', '.join(over)}")
+    if regressions or over: sys.exit(1)
@@ -0,0 +1,105 @@
+# library initialization
+import csv
+import json
+import time
+import pygame
+import numpy as np
+from collections import deque
+
+# phases of a frame, in the order they happen in the game_scene frames (the simulation ones being summed over the ticks of the frame)
+phases = ["events", "movement", "police", "collisions", "food", "render", "display", "idle"]
+window_frames = 600 # frames kept for the rolling percentiles (10 seconds at 60 frames per second)
+trace_frames = 36000 # frames kept for the trace export (10 minutes at 60 frames per second)
+overlay_period = 0.5 # seconds between two updates of the overlay
+overlay_color = (255, 255, 255)
+overlay_background = (0, 0, 0)
+
+class frame_profiler():
+    """
+    class responsible for timing the phases of every frame with perf_counter_ns
+    run_scenes calls frame_start at the beginning of a frame and mark(phase) at the end of each phase, the time elapsed
+    since the previous mark being added to that phase, and frame_end once the frame is over
+    the durations of the last window_frames frames are kept for the rolling p50/p95/p99, and when tracing the spans of
+    every phase are kept as well, to be exported as CSV (one row per frame) or as a Chrome trace (chrome://tracing)
+    the instrumented code only checks whether a profiler is set, so that it costs nearly nothing when profiling is off
+    """
+
+    def __init__(self, tracing=False):
+        self.tracing = tracing
+        self.overlay = False
+        self.durations = {phase: deque(maxlen=window_frames) for phase in phases + ["frame"]}
+        self.trace = deque(maxlen=trace_frames)
+        self.frames = 0
+        self.frame_begin = self.last = time.perf_counter_ns()
+        self.current = dict.fromkeys(phases, 0)
+        self.spans = []
+        self.overlay_surface = None
+        self.overlay_time = None
+        self.font = None
+
+    def frame_start(self):
+        self.frame_begin = self.last = time.perf_counter_ns()
+        self.current = dict.fromkeys(phases, 0)
+        self.spans = []
+
+    def mark(self, phase):
+        now = time.perf_counter_ns()
+        self.current[phase] += now - self.last
+        if self.tracing: self.spans.append((phase, self.last, now))
+        self.last = now
+
+    def frame_end(self):
+        for phase in phases: self.durations[phase].append(self.current[phase])
+        self.durations["frame"].append(self.last - self.frame_begin)
+        if self.tracing: self.trace.append((self.frames, self.frame_begin, self.last - self.frame_begin, self.current, self.spans))
+        self.frames += 1
+
+    def percentiles(self, phase):
+        # p50, p95 and p99 of the phase over the rolling window, in milliseconds
+        if len(self.durations[phase]) == 0: return 0.0, 0.0, 0.0
+        return tuple(np.percentile(np.fromiter(self.durations[phase], dtype=np.int64), [50, 95, 99]) / 1e6)
+
+    def overlay_state(self):
+        """
+        returns the overlay as a (rectangle, surface) pair in the top right corner, or None when it is hidden
+        the surface is rendered again every overlay_period seconds only, the same one being returned in between
+        """
+
+        if not self.overlay: return None
+
+        now = time.perf_counter()
+        if self.overlay_surface is None or now - self.overlay_time >= overlay_period:
+            if self.font is None: self.font = pygame.font.Font(None, 20)
+            lines = ["phase        p50     p95     p99 (ms)"]
+            for phase in phases + ["frame"]: lines.append(f"{phase:10} " + " ".join(f"{value:7.2f}" for value in self.percentiles(phase)))
+
+            texts = [self.font.render(line, True, overlay_color, overlay_background) for line in lines]
+            self.overlay_surface = pygame.Surface((max(text.get_width() for text in texts) + 8, sum(text.get_height() for text in texts) + 8))
+            self.overlay_surface.fill(overlay_background)
+            y_coord = 4
+            for text in texts:
+                self.overlay_surface.blit(text, (4, y_coord))
+                y_coord += text.get_height()
+            self.overlay_time = now
+
+        display_width = pygame.display.get_surface().get_width()
+        return self.overlay_surface.get_rect(topright=(display_width, 0)), self.overlay_surface
+
+    def export(self, path):
+        """
+        writes the trace of the frames, as a Chrome trace if the path ends with .json and as CSV otherwise
+        """
+
+        if path.endswith(".json"):
+            events = []
+            for frame, begin, duration, current, spans in self.trace:
+                events.append({"name": "frame", "ph": "X", "ts": begin / 1e3, "dur": duration / 1e3, "pid": 0, "tid": 0, "args": {"frame": frame}})
+                for phase, start, end in spans: events.append({"name": phase, "ph": "X", "ts": start / 1e3, "dur": (end - start) / 1e3, "pid": 0, "tid": 0})
+
+            with open(path, "w") as trace_file: json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+        else:
+            with open(path, "w", newline="") as trace_file:
+                writer = csv.writer(trace_file)
+                writer.writerow(["frame", "start_ms", "frame_ms"] + [f"{phase}_ms" for phase in phases])
+                for frame, begin, duration, current, spans in self.trace:
+                    writer.writerow([frame, f"{begin / 1e6:.3f}", f"{duration / 1e6:.3f}"] + [f"{current[phase] / 1e6:.3f}" for phase in phases])
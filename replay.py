@@ -0,0 +1,201 @@
+# library initialization
+import argparse
+import struct
+import time
+import pygame
+
+import snake
+
+# a replay holds the seed and the settings of a game along with the actions of the player and the tick each of them was
+# applied at, everything else being derived from the seed so that the game can be played again exactly
+# the file is a header (magic, version, difficulty, police mode, flags, seed, number of cops from version 2 on and size
+# of the world in chunks from version 3 on, 0 standing for the single screen board) followed by one event per action (the
+# number of ticks since the previous one as a varint and the action as a byte) and an end event holding the total number
+# of ticks and the final score, which lets the player check that the re-simulated game did not diverge
+magic = b"PCSR"
+version = 3
+header_format = "<4sBBBBq"
+cops_format = "<H" # after the header from version 2 on
+world_format = "<BB" # after the number of cops from version 3 on
+actions = ["up", "down", "left", "right"]
+end_marker = 255
+seek_seconds = 5 # seconds of game skipped by the left and right keys during the playback
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, position
+        shift += 7
+
+class replay():
+    """
+    class holding a recorded game: its settings, its seed and its actions indexed by tick
+    """
+
+    def __init__(self, difficulty, police_chase, police_mode, seed, n_police=1, world_chunks=None, events=None, total_ticks=None, score=None):
+        self.difficulty = difficulty
+        self.police_chase = police_chase
+        self.police_mode = police_mode
+        self.seed = seed
+        self.n_police = n_police
+        self.world_chunks = world_chunks
+        self.events = events if events is not None else {}
+        self.total_ticks = total_ticks
+        self.score = score
+
+    def new_game(self):
+        return snake.game_state(difficulty=self.difficulty, police_chase=self.police_chase, police_mode=self.police_mode, seed=self.seed, n_police=self.n_police, world_chunks=self.world_chunks)
+
+    def to_bytes(self):
+        buffer = bytearray(struct.pack(header_format, magic, version, list(snake.speed.keys()).index(self.difficulty),
+                                       snake.police_modes.index(self.police_mode), int(self.police_chase), self.seed))
+        buffer += struct.pack(cops_format, self.n_police)
+        buffer += struct.pack(world_format, *(self.world_chunks if self.world_chunks is not None else (0, 0)))
+        previous = 0
+        for tick in sorted(self.events):
+            write_varint(buffer, tick - previous)
+            buffer.append(actions.index(self.events[tick]))
+            previous = tick
+
+        write_varint(buffer, self.total_ticks - previous)
+        buffer.append(end_marker)
+        write_varint(buffer, self.score)
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data):
+        our_magic, our_version, difficulty, police_mode, flags, seed = struct.unpack_from(header_format, data)
+        if our_magic != magic: raise ValueError("not a replay file")
+        if our_version > version: raise ValueError(f"unsupported replay version {our_version}")
+
+        our_replay = cls(difficulty=list(snake.speed.keys())[difficulty], police_chase=bool(flags & 1), police_mode=snake.police_modes[police_mode], seed=seed)
+        position = struct.calcsize(header_format)
+        if our_version >= 2:
+            our_replay.n_police, = struct.unpack_from(cops_format, data, position)
+            position += struct.calcsize(cops_format)
+        if our_version >= 3:
+            columns, rows = struct.unpack_from(world_format, data, position)
+            position += struct.calcsize(world_format)
+            if columns > 0: our_replay.world_chunks = (columns, rows)
+        tick = 0
+        while True:
+            delta, position = read_varint(data, position)
+            tick += delta
+            action = data[position]
+            position += 1
+            if action == end_marker: break
+            our_replay.events[tick] = actions[action]
+
+        our_replay.total_ticks = tick
+        our_replay.score, position = read_varint(data, position)
+        return our_replay
+
+class recorder():
+    """
+    class responsible for recording a game while it is played, the actions being given along with the tick they apply at
+    """
+
+    def __init__(self, our_game):
+        self.game = our_game
+        self.replay = replay(difficulty=our_game.difficulty, police_chase=our_game.police_chase, police_mode=our_game.police_mode, seed=our_game.seed, n_police=our_game.n_police, world_chunks=our_game.world)
+
+    def record(self, tick, action):
+        if action is not None: self.replay.events[tick] = action
+
+    def save(self, path):
+        self.replay.total_ticks = self.game.ticks
+        self.replay.score = self.game.score()
+        with open(path, "wb") as replay_file: replay_file.write(self.replay.to_bytes())
+
+def load(path):
+    with open(path, "rb") as replay_file: return replay.from_bytes(replay_file.read())
+
+def simulate(our_replay, until=None):
+    """
+    re-simulates the recorded game without any display nor frame cap, up to the tick until (the end of the game by default)
+    """
+
+    until = our_replay.total_ticks if until is None else min(until, our_replay.total_ticks)
+    our_game = our_replay.new_game()
+    events = our_replay.events
+    while our_game.ticks < until: our_game.step(events.get(our_game.ticks))
+    return our_game
+
+def playback(our_replay):
+    """
+    draws the recorded game at its own pace, space pausing it, the left and right keys seeking seek_seconds backwards
+    or forwards (the game being re-simulated up to the tick sought) and the up and down keys changing the playback speed
+    """
+
+    snake.init_display()
+    frame_rate = snake.refresh_rate()
+    playback_speed = 1.0
+    paused = False
+    target = 0
+
+    while True:
+        # (re)starts the game at the tick sought, with a fresh background and renderer
+        our_game = simulate(our_replay, until=target)
+        our_renderer = snake.new_renderer(our_game, snake.render_mode)
+        our_scheduler = snake.scheduler(tick_rate=our_game.food.snake_speed * playback_speed)
+        next_blink = 0
+        target = None
+
+        while target is None:
+            for event in pygame.event.get():
+                if event.type == snake.stop or (event.type == snake.anykey and event.key == snake.q):
+                    pygame.quit()
+                    return
+
+                if event.type == snake.anykey:
+                    seek = round(seek_seconds * our_game.food.snake_speed)
+                    if event.key == pygame.K_SPACE: paused = not paused
+                    elif event.key == snake.left: target = max(0, our_game.ticks - seek)
+                    elif event.key == snake.right: target = our_game.ticks + seek
+                    elif event.key == snake.up: playback_speed *= 2
+                    elif event.key == snake.down: playback_speed /= 2
+
+            if target is not None: break
+
+            # the recorded actions are applied at their tick, the game stopping on its last one
+            due_ticks = our_scheduler.due_ticks()
+            if paused: due_ticks = 0
+            for tick in range(due_ticks):
+                if our_game.ticks >= our_replay.total_ticks: break
+                our_game.step(our_replay.events.get(our_game.ticks))
+
+                if our_game.police is not None and our_game.ticks >= next_blink:
+                    our_game.police.blinking()
+                    next_blink = our_game.ticks + max(1, round(snake.blinking_period * our_game.food.snake_speed))
+
+            our_scheduler.set_tick_rate(our_game.food.snake_speed * playback_speed)
+            our_renderer.draw(alpha=1.0 if paused or our_game.ticks >= our_replay.total_ticks else our_scheduler.alpha())
+            snake.clock.tick(frame_rate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays a recorded game again")
+    parser.add_argument("path", help="replay file written by snake.py --record")
+    parser.add_argument("--headless", action="store_true", help="re-simulate the game without display nor frame cap and check its outcome")
+    parser.add_argument("--render", choices=snake.render_modes, default=snake.render_mode, help="redraw only what changed (dirty) or the whole screen (full) every frame")
+    args = parser.parse_args()
+
+    our_replay = load(args.path)
+    if args.headless:
+        start = time.perf_counter()
+        our_game = simulate(our_replay)
+        elapsed = time.perf_counter() - start
+        outcome = "matches the recording" if our_game.score() == our_replay.score else f"diverged from the recording (score {our_replay.score})"
+        print(f"seed {our_replay.seed}, {our_game.ticks} ticks, score {our_game.score()}, {outcome}, {our_game.ticks / elapsed if elapsed > 0 else float('inf'):.0f} ticks/s")
+    else:
+        snake.render_mode = args.render
+        snake.cached_levels = snake.level_cache(directory=snake.default_level_directory) # seeking starts the game again
+        playback(our_replay)
@@ -0,0 +1,304 @@
+# library initialization
+import os
+import stat
+import zlib
+import queue
+import socket
+import struct
+import argparse
+import threading
+import numpy as np
+
+import snake
+
+# the server publishes the games played to its subscribers as a stream of messages, each one being a type byte and the
+# length of its payload (little-endian) followed by the payload:
+# - level, once per game and to every subscriber joining one: magic, version, screen size, block size, difficulty,
+#   police mode, flags (bit 0 police chase, bit 1 large world) and seed, then the obstacle pixels of the screen packed
+#   8 per byte and compressed with zlib (none in a large world, whose chunks are generated from the seed)
+# - keyframe: tick, score, food (-1 when there is none) and its type, the cops and the whole body of the snake
+# - delta: the same header and cops, then the squares pushed at the head since the previous frame and the number of
+#   squares dropped from the tail, which is all a subscriber needs to keep the body up to date
+# - end: tick, score and what the game was lost to
+# positions are int16 pairs; subscribers send actions back as single bytes (1 up, 2 down, 3 left, 4 right)
+magic = b"PCSS"
+version = 1
+message_format = "<BI"
+level_format = "<4sBHHHBBBq"
+frame_format = "<IHhhBH" # tick, score, food x, food y, food type, number of cops
+delta_format = "<HH" # squares pushed, squares dropped
+end_format = "<IHB"
+level_message, keyframe_message, delta_message, end_message = 1, 2, 3, 4
+actions = ["up", "down", "left", "right"]
+causes = [None, "police", "obstacle", "tail"]
+no_food = 255
+default_port = 7777
+subscriber_queue_size = 256 # messages waiting for a subscriber, beyond which it is resynchronized with a keyframe
+
+def message(kind, payload):
+    return struct.pack(message_format, kind, len(payload)) + payload
+
+def parse_address(text):
+    # a path for a Unix domain socket, a port or host:port for TCP
+    if os.sep in text or text.endswith(".sock"): return text
+    host, separator, port = text.rpartition(":")
+    return (host if separator else "127.0.0.1", int(port))
+
+def open_socket(address):
+    return socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET, socket.SOCK_STREAM)
+
+def remove_socket(path):
+    # removes the Unix domain socket at the path (left by a previous server), any other kind of file being kept
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode): os.remove(path)
+    except OSError:
+        pass
+
+class subscriber():
+    """
+    class responsible for one connection: a sender thread writes the messages of its bounded queue to the socket and
+    a reader thread hands the actions received to the server, so that a slow or gone subscriber never blocks the game
+    """
+
+    def __init__(self, connection, received):
+        self.connection = connection
+        self.received = received
+        self.queue = queue.Queue(maxsize=subscriber_queue_size)
+        self.synced = False # whether it has the level and the body of the current game
+        self.closed = False
+        threading.Thread(target=self.sender, name="stream sender", daemon=True).start()
+        threading.Thread(target=self.reader, name="stream reader", daemon=True).start()
+
+    def send(self, data):
+        """
+        queues a message, returns False (and drops what was waiting) when the subscriber fell too far behind, in which
+        case it is sent a keyframe again once it catches up
+        """
+
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except queue.Full:
+            while True:
+                try: self.queue.get_nowait()
+                except queue.Empty: break
+            self.synced = False
+            return False
+
+    def sender(self):
+        try:
+            while True:
+                data = self.queue.get()
+                if data is None: break
+                self.connection.sendall(data)
+        except OSError:
+            pass
+        self.close()
+
+    def reader(self):
+        try:
+            while True:
+                data = self.connection.recv(256)
+                if not data: break
+                for byte in data:
+                    if 1 <= byte <= len(actions): self.received.put(actions[byte - 1])
+        except OSError:
+            pass
+        self.close()
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        try: self.queue.put_nowait(None)
+        except queue.Full: pass
+        try: self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        self.connection.close()
+
+class state_server():
+    """
+    class responsible for streaming the games to local subscribers (spectators and external bots)
+    the game calls start_game, publish after every tick and end_game; every message is encoded once, whatever the
+    number of subscribers, and only queued for each of them, the sockets being written by the subscribers' threads
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.listener = open_socket(address)
+        if isinstance(address, str): remove_socket(address)
+        if not isinstance(address, str): self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(address)
+        self.listener.listen()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.received = queue.SimpleQueue()
+        self.level = None
+        self.last_ticks = 0
+        self.last_length = 0
+        threading.Thread(target=self.accept, name="stream accept", daemon=True).start()
+
+    def accept(self):
+        while True:
+            try: connection, address = self.listener.accept()
+            except OSError: return
+            if not isinstance(self.address, str): connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock: self.subscribers.append(subscriber(connection, self.received))
+
+    def actions(self):
+        # the actions received since the last call, in the order they arrived
+        received = []
+        while not self.received.empty(): received.append(self.received.get_nowait())
+        return received
+
+    def start_game(self, our_game):
+        world = our_game.world is not None
+        header = struct.pack(level_format, magic, version, snake.dis_width, snake.dis_height, snake.snake_block, list(snake.speed).index(our_game.difficulty),
+                             snake.police_modes.index(our_game.police_mode), int(our_game.police_chase) | int(world) << 1, our_game.seed)
+        grid = b""
+        if not world:
+            cells = our_game.borders.cells
+            margin = our_game.borders.margin
+            grid = zlib.compress(np.packbits(cells[margin:margin + snake.dis_width, margin:margin + snake.dis_height]).tobytes())
+
+        self.level = message(level_message, header + grid)
+        self.last_ticks = our_game.ticks
+        self.last_length = len(our_game.snake.surface)
+        with self.lock:
+            for our_subscriber in self.subscribers: our_subscriber.synced = False
+
+    def frame_header(self, our_game):
+        our_food = our_game.food
+        food = (-1, -1, no_food) if our_food.x_coord is None else (round(our_food.x_coord), round(our_food.y_coord), list(snake.foodDicts).index(our_food.foodtype))
+        if our_game.police is None: cops = np.zeros((0, 2), dtype=np.int16)
+        elif our_game.n_police > 1: cops = np.column_stack((np.rint(our_game.police.x_coords), np.rint(our_game.police.y_coords))).astype(np.int16)
+        else: cops = np.array(our_game.police.positions(), dtype=np.int16).reshape(-1, 2)
+        return struct.pack(frame_format, our_game.ticks, our_game.score(), *food, len(cops)) + cops.tobytes()
+
+    def publish(self, our_game):
+        """
+        sends the state of the game at its current tick, as a delta to the subscribers in sync and as a keyframe to
+        the other ones (preceded by the level), each message being encoded at most once
+        """
+
+        body = our_game.snake.surface.array()
+        pushed = our_game.ticks - self.last_ticks
+        dropped = self.last_length + pushed - len(body)
+        self.last_ticks, self.last_length = our_game.ticks, len(body)
+
+        with self.lock:
+            self.subscribers = [our_subscriber for our_subscriber in self.subscribers if not our_subscriber.closed]
+            our_subscribers = list(self.subscribers)
+        if not our_subscribers: return
+
+        header = self.frame_header(our_game)
+        keyframe = delta = None
+        for our_subscriber in our_subscribers:
+            if our_subscriber.synced and 0 < pushed <= len(body) and dropped >= 0:
+                if delta is None: delta = message(delta_message, header + struct.pack(delta_format, pushed, dropped) + body[len(body) - pushed:].tobytes())
+                our_subscriber.send(delta)
+            else:
+                if keyframe is None: keyframe = message(keyframe_message, header + struct.pack("<I", len(body)) + body.tobytes())
+                our_subscriber.synced = our_subscriber.send(self.level) and our_subscriber.send(keyframe)
+
+    def end_game(self, our_game):
+        data = message(end_message, struct.pack(end_format, our_game.ticks, our_game.score(), causes.index(our_game.cause)))
+        with self.lock: our_subscribers = list(self.subscribers)
+        for our_subscriber in our_subscribers:
+            if our_subscriber.synced: our_subscriber.send(data)
+
+    def close(self):
+        self.listener.close()
+        with self.lock:
+            for our_subscriber in self.subscribers: our_subscriber.close()
+        if isinstance(self.address, str): remove_socket(self.address)
+
+class state_client():
+    """
+    class responsible for following a stream: it decodes the messages and keeps the state of the game up to date
+    (obstacle pixels, tick, score, food, cops and body), and sends actions back
+    """
+
+    def __init__(self, address):
+        self.connection = open_socket(address)
+        self.connection.connect(address)
+        self.stream = self.connection.makefile("rb")
+        self.grid = None
+        self.seed = None
+        self.difficulty = None
+        self.police_chase = False
+        self.tick = 0
+        self.score = 0
+        self.food = None
+        self.cops = []
+        self.body = np.zeros((0, 2), dtype=np.int16)
+        self.cause = None
+
+    def read(self):
+        """
+        reads and applies the next message, returns its type (None once the stream is closed)
+        """
+
+        header = self.stream.read(struct.calcsize(message_format))
+        if len(header) < struct.calcsize(message_format): return None
+        kind, length = struct.unpack(message_format, header)
+        payload = self.stream.read(length)
+
+        if kind == level_message:
+            our_magic, our_version, width, height, block, difficulty, police_mode, flags, self.seed = struct.unpack_from(level_format, payload)
+            if our_magic != magic: raise ValueError("not a game stream")
+            self.difficulty = list(snake.speed)[difficulty]
+            self.police_chase = bool(flags & 1)
+            grid = payload[struct.calcsize(level_format):]
+            self.grid = np.unpackbits(np.frombuffer(zlib.decompress(grid), dtype=np.uint8), count=width * height).reshape(width, height).view(bool) if grid else None
+            self.cause = None
+        elif kind in (keyframe_message, delta_message):
+            self.tick, self.score, x_food, y_food, food_type, n_cops = struct.unpack_from(frame_format, payload)
+            self.food = None if food_type == no_food else (x_food, y_food, list(snake.foodDicts)[food_type])
+            position = struct.calcsize(frame_format)
+            self.cops = np.frombuffer(payload, dtype=np.int16, count=2 * n_cops, offset=position).reshape(-1, 2).tolist()
+            position += 4 * n_cops
+            if kind == keyframe_message:
+                length, = struct.unpack_from("<I", payload, position)
+                self.body = np.frombuffer(payload, dtype=np.int16, count=2 * length, offset=position + 4).reshape(-1, 2).copy()
+            else:
+                pushed, dropped = struct.unpack_from(delta_format, payload, position)
+                squares = np.frombuffer(payload, dtype=np.int16, count=2 * pushed, offset=position + struct.calcsize(delta_format)).reshape(-1, 2)
+                self.body = np.concatenate((self.body[dropped:], squares))
+        elif kind == end_message:
+            self.tick, self.score, cause = struct.unpack(end_format, payload)
+            self.cause = causes[cause]
+
+        return kind
+
+    def send(self, action):
+        self.connection.sendall(bytes([actions.index(action) + 1]))
+
+    def close(self):
+        self.connection.close()
+
+def seeking_action(client):
+    # direction of the food from the head, for the demonstration bot (the game rejects the reversals)
+    if client.food is None or len(client.body) == 0: return None
+    x_head, y_head = client.body[-1].tolist()
+    if client.food[0] != x_head: return "right" if client.food[0] > x_head else "left"
+    if client.food[1] != y_head: return "down" if client.food[1] > y_head else "up"
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follows the games streamed by snake.py --serve")
+    parser.add_argument("address", nargs="?", default=str(default_port), help="port, host:port or path of the Unix domain socket")
+    parser.add_argument("--bot", action="store_true", help="play the games by sending actions heading for the food")
+    args = parser.parse_args()
+
+    client = state_client(parse_address(args.address))
+    last_action = None
+    while True:
+        kind = client.read()
+        if kind is None: break
+        if kind == level_message: print(f"game of seed {client.seed} ({client.difficulty}{', police chase' if client.police_chase else ''})")
+        if kind == end_message: print(f"lost to {client.cause} at tick {client.tick}, score {client.score}")
+        if kind in (keyframe_message, delta_message):
+            if client.tick % 100 == 0: print(f"tick {client.tick}, score {client.score}, length {len(client.body)}, {len(client.cops)} cop(s)")
+            action = seeking_action(client) if args.bot else None
+            if action is not None and action != last_action: client.send(action)
+            last_action = action
@@ -1,14 +1,19 @@
 # library initialization
 import pygame
 import random
-import sys
+import os
+import math
+import time
+import threading
+import bisect
+import functools
+import itertools
+import argparse
+import zipfile
+import zlib
+import weakref
 import numpy as np
-import scipy.stats as stats
-from datetime import datetime, timedelta
-
-# game initialization
-pygame.init()
-pygame.display.set_caption('Enhanced Snake Game')
+from collections import deque, Counter, OrderedDict
 
 # colors initialization
 black = (0, 0, 0)
@@ -33,6 +38,7 @@ anykey = pygame.KEYDOWN
 stop = pygame.QUIT
 q = pygame.K_q
 c = pygame.K_c
+overlay_key = pygame.K_F3
 key2 = pygame.K_KP2
 key4 = pygame.K_KP4
 key6 = pygame.K_KP6
@@ -42,6 +48,7 @@ key8 = pygame.K_KP8
 foodDicts = {'regular': bright_blue, 'double': bright_red, 'fast': green}
 secondsMultiplier = 5
 fasterMultiplier = 2
+blinking_period = 0.2 # seconds between two colors of the police light
 
 # obstacles grid initialization (depending on difficulty)
 init_grid_format = {"easy": 3, "medium": 5, "hard": 5}
@@ -51,17 +58,636 @@ speed = {"easy": 10, "medium": 17, "hard": 25}
 dis_width = 1000
 dis_height = 720
 snake_block = 10
-dis = pygame.display.set_mode((dis_width, dis_height))
-font_style = pygame.font.SysFont("bahnschrift", 25)
-clock = pygame.time.Clock()
+
+# display objects, only created by init_display so that the simulation can run headless
+dis = None
+font_style = None # loaded on the first text rendered
+clock = None
+background_surface = None # obstacles of the current game when its level is not cached, printed over by every game
+render_modes = ["dirty", "full"]
+render_mode = "dirty"
+dirty_sprites_limit = 32 # beyond that many moving sprites (a swarm of cops), redrawing the whole screen is cheaper
+record_path = None # when set, every game played is recorded there, the seed of the game suffixed to the name (see replay.py)
+profiler = None # when set, times the phases of every frame (see profiler.py)
+trace_path = None # when set, the trace of the frames timed by the profiler is written there
+stream_server = None # when set, every tick of the games played is streamed to its subscribers (see server.py)
+
+# cops, food and level buffers (the obstacle grids, bodies and spawn indexes of the single screen board) of the games
+# closed, reused by the next games (see game_state.close)
+police_pool = []
+food_pool = []
+grid_pool = []
+body_pool = []
+spawn_pool = []
+pool_size = 4
+
+# input of the player (see input_queue)
+input_capacity = 3 # directions queued ahead of the ticks, the presses beyond being dropped
+input_expiry = 1.0 # seconds after which a queued direction no longer applies
+input_poll_period = 0.002 # seconds between two polls of the keyboard while waiting for the next frame
 
 # additional variables related to the police chase feature
 inside_circle_radius = 10 # largest circle inside a square
-outside_circle_radius = np.sqrt(200) # smallest circle outside a squre
+outside_circle_radius = math.sqrt(200) # smallest circle outside a squre
 police_turbo = 1.10
+police_best_move = 0.8 # share of the moves where the cop heads straight for the snake
+police_random_moves = ["up", "down", "right", "left", "nothing"]
+police_random_weights = [0.05, 0.05, 0.05, 0.05, 0.8]
+police_max_attempts = 32 # a blocked cop draws its move again, up to that many times before staying in place for the frame
+police_modes = ["greedy", "pathfinding"]
+police_mode = "greedy" # how the cops of the games played from the menu head for the snake
+field_budget = 1500 # maximum number of cells the pathfinding search expands per frame
+field_refresh = 16 # moves of the head the distance field is repaired for before it is searched again
+police_count = 1 # cops chasing the snake, updated together as a swarm when there are several
+police_spawn_clearance = 3 # cells around the snake's head where no cop is placed (its capture range and one move of the cop)
+
+# obstacles are indexed pixel by pixel, with a margin since blocks can overflow the screen (hard diamonds reach 44 pixels)
+grid_margin = 64
+
+# large worlds are made of chunks of the size of the screen, generated when the snake gets close and forgotten when far away
+world_size = None # chunks per side of the world played from the menu, None for the single screen board
+max_world_size = 32 # the body of the snake stores its squares as int16
+chunk_capacity = 16 # chunks kept in memory
+chunk_surfaces = 6 # rasterized chunks kept for the display (at most four are visible at once)
+prefetch_distance = dis_width // 2 # chunks closer than that to the screen are generated ahead of time
+world_spawn_attempts = 64 # random cells tried before giving up on placing the food or the cop
+
+# levels of the single screen board, kept ready by a background thread and on disk (see level_cache)
+cached_levels = None # when set, the games take their levels from it instead of building them
+level_memory = 8 # levels kept in memory
+level_prepared = 2 # most recently used levels of the memory kept prepared (unpacked and drawn, see level.prepare)
+level_pool_size = 2 # fresh levels kept ready per difficulty, prepared
+level_delay = 0.5 # seconds the background thread waits after a level is taken, so as not to slow down the start of its game
+level_files = 1024 # level files kept on disk, the oldest ones being removed when the cache starts
+level_version = 1 # version of the level generation, to be bumped whenever it changes so that the files on disk are not read
+cache_directory = os.path.join(os.path.expanduser("~"), ".cache", "police-chase-snake")
+default_level_directory = os.path.join(cache_directory, "levels")
+
+# font of the texts, looked up among the system fonts once and then loaded from the path cached (see load_font)
+font_name = "bahnschrift"
+font_size = 25
+font_cache_path = os.path.join(cache_directory, "font.txt")
+
+# neighbourhood probes, as pixel offsets around a position, used by the collision checks
+cross_probe = ((snake_block, 0), (-snake_block, 0), (0, snake_block), (0, -snake_block))
+corners_probe = ((0, 0), (snake_block, snake_block), (-snake_block, snake_block), (snake_block, -snake_block), (-snake_block, -snake_block))
+food_probe = ((15, 15), (-15, 15), (15, -15), (-15, -15))
+
+class obstacle_grid():
+    """
+    class responsible for indexing the obstacle pixels
+    every pixel of the screen (and of a margin around it) is a boolean cell of a numpy occupancy grid
+    so that knowing whether a position is part of an obstacle is a constant-time lookup instead of a scan of every pixel
+    its width and height are the size of the world it covers, like the ones of chunked_grid
+    """
+
+    def __init__(self, dis_width, dis_height, margin=grid_margin):
+        self.margin = margin
+        self.width = dis_width
+        self.height = dis_height
+        self.cells = np.zeros((dis_width + 2 * margin, dis_height + 2 * margin), dtype=bool)
+        self.probed = {} # blocked cells of the probes already answered (see cells_blocked), forgotten when the obstacles change
+
+    def add_mask(self, x_coord, y_coord, mask):
+        """
+        rasterizes a whole block at once: the boolean mask is or-ed into the grid with its top-left corner at the position
+        """
+
+        x_start = x_coord + self.margin
+        y_start = y_coord + self.margin
+        x_clip = max(0, -x_start)
+        y_clip = max(0, -y_start)
+        x_end = min(self.cells.shape[0], x_start + mask.shape[0])
+        y_end = min(self.cells.shape[1], y_start + mask.shape[1])
+        if x_end <= x_start + x_clip or y_end <= y_start + y_clip: return
+
+        self.cells[x_start + x_clip:x_end, y_start + y_clip:y_end] |= mask[x_clip:x_end - x_start, y_clip:y_end - y_start]
+        self.probed.clear()
+
+    def clear(self):
+        self.cells[:] = False
+        self.probed.clear()
+
+    def is_blocked(self, x_coord, y_coord):
+        x_cell = round(x_coord) + self.margin
+        y_cell = round(y_coord) + self.margin
+        if 0 <= x_cell < self.cells.shape[0] and 0 <= y_cell < self.cells.shape[1]: return bool(self.cells[x_cell, y_cell])
+        return False
+
+    def any_blocked(self, x_coord, y_coord, probe):
+        """
+        answers a whole neighbourhood probe in one call
+        the probe is a sequence of pixel offsets around the position (see cross_probe, corners_probe and food_probe)
+        and the position is deemed blocked as soon as one of the probed pixels is part of an obstacle
+        """
+
+        x_cell = round(x_coord) + self.margin
+        y_cell = round(y_coord) + self.margin
+        width, height = self.cells.shape
+
+        for x_offset, y_offset in probe:
+            x_probe = x_cell + x_offset
+            y_probe = y_cell + y_offset
+            if 0 <= x_probe < width and 0 <= y_probe < height and self.cells[x_probe, y_probe]: return True
+
+        return False
+
+    def blocked(self, x_coords, y_coords):
+        """
+        vectorized lookup of arrays of positions, positions outside of the grid are never blocked
+        """
+
+        x_cells = np.rint(x_coords).astype(np.intp) + self.margin
+        y_cells = np.rint(y_coords).astype(np.intp) + self.margin
+        inside = (x_cells >= 0) & (x_cells < self.cells.shape[0]) & (y_cells >= 0) & (y_cells < self.cells.shape[1])
+
+        result = np.zeros(np.shape(x_cells), dtype=bool)
+        result[inside] = self.cells[x_cells[inside], y_cells[inside]]
+        return result
+
+    def cells_blocked(self, probe):
+        """
+        whether each snake_block cell of the screen (numbered column by column) is blocked for the probe, all probed at once
+        the answer is kept until the obstacles change, the spawn indexes and the distance field of a game asking the same
+        probes again (and a level handing out the answers it was prepared with, see level.copy_to)
+        """
+
+        blocked = self.probed.get(probe)
+        if blocked is None:
+            columns, rows = self.width // snake_block, self.height // snake_block
+            x_coords, y_coords = np.meshgrid(np.arange(columns) * snake_block, np.arange(rows) * snake_block, indexing="ij")
+            blocked = np.zeros(x_coords.shape, dtype=bool)
+            for x_offset, y_offset in probe: blocked |= self.blocked(x_coords + x_offset, y_coords + y_offset)
+            blocked = self.probed[probe] = blocked.ravel()
+        return blocked
+
+    def rendering_mask(self, dis_width, dis_height, snake_block):
+        """
+        every obstacle pixel is drawn as a square of snake_block pixels starting at its position
+        so the drawn area is the grid dilated towards the right and the bottom, which we compute with shifted copies
+        """
+
+        covered = self.cells.copy()
+        for shift in range(1, snake_block): covered[shift:, :] |= self.cells[:-shift, :]
+
+        dilated = covered.copy()
+        for shift in range(1, snake_block): covered[:, shift:] |= dilated[:, :-shift]
+
+        return covered[self.margin:self.margin + dis_width, self.margin:self.margin + dis_height]
+
+def journal_path(current, target):
+    """
+    the entries of a journal to undo, from the current one back to the last entry it has in common with the target, and
+    the ones to do again from there to the target (in the order they were made), entries being (previous entry, depth, ...)
+    tuples that are never modified, so that a journal branching out from an entry it went back to keeps both branches
+    """
+
+    undone, redone = [], []
+    while current is not target:
+        if current is None or target is None or current[1] == target[1] == 0: raise ValueError("the snapshot was not taken from this game")
+        if current[1] >= target[1]:
+            undone.append(current)
+            current = current[0]
+        else:
+            redone.append(target)
+            target = target[0]
+    redone.reverse()
+    return undone, redone
+
+class body_buffer():
+    """
+    class responsible for storing the squares of a snake's body (its surface) compactly
+    the coordinates are int16 pairs in a numpy array used as a sliding window: a new head is written after the last square
+    and dropping the tail only moves the start forward, the live squares being copied back to the front when the end of
+    the array is reached (at most once every capacity - length pushes, which makes pushes constant time on average)
+    an occupancy counter on the snake_block cells tells in constant time how many squares lie on the cell of a position
+    listeners (such as the spawn indexes) are told whenever a cell becomes occupied or free again
+    in a large world the counter is sparse (only the occupied cells are stored), so that it does not grow with the world
+    while the game has snapshots, the changes of the counter are journaled like the ones of the spawn indexes, a snapshot
+    being a copy of the live squares and the current entry of the journal
+    """
+
+    padding = 2 # cells around the screen, since the body can hold positions just outside of it before the snake breaches
+
+    def __init__(self, capacity=64, sparse=False):
+        self.squares = np.zeros((capacity, 2), dtype=np.int16)
+        self.start = 0
+        self.end = 0
+        self.sparse = sparse
+        if sparse: self.occupancy = Counter()
+        else: self.occupancy = np.zeros((dis_width // snake_block + 2 * self.padding + 1, dis_height // snake_block + 2 * self.padding + 1), dtype=np.int32)
+        self.journal = None # last change of the counter journaled, as (previous entry, depth, cell, step), None when not journaling
+        self.listeners = []
+
+    def __len__(self):
+        return self.end - self.start
+
+    def clear(self):
+        self.start = self.end = 0
+        if self.sparse: self.occupancy.clear()
+        else: self.occupancy.fill(0)
+        self.journal = None
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array() if dtype is None else self.array().astype(dtype)
+
+    def array(self):
+        # live squares from the tail to the head, as a view (no copy)
+        return self.squares[self.start:self.end]
+
+    def cell(self, x_coord, y_coord):
+        x_cell = round(x_coord) // snake_block + self.padding
+        y_cell = round(y_coord) // snake_block + self.padding
+        if self.sparse: return x_cell, y_cell
+        if 0 <= x_cell < self.occupancy.shape[0] and 0 <= y_cell < self.occupancy.shape[1]: return x_cell, y_cell
+        return None
+
+    def count(self, x_coord, y_coord):
+        cell = self.cell(x_coord, y_coord)
+        return int(self.occupancy.get(cell, 0) if self.sparse else self.occupancy[cell]) if cell is not None else 0
+
+    def any_within(self, x_cell, y_cell, span):
+        # whether a square lies on the span x span cells from the given one (in snake_block units), without any copy
+        if self.sparse: return any(self.occupancy.get((x_cell + self.padding + x_step, y_cell + self.padding + y_step), 0) > 0 for x_step in range(span) for y_step in range(span))
+        x_first, y_first = x_cell + self.padding, y_cell + self.padding
+        return np.count_nonzero(self.occupancy[max(x_first, 0):max(x_first + span, 0), max(y_first, 0):max(y_first + span, 0)]) > 0
+
+    def last(self):
+        return self.squares[self.end - 1].tolist() if self.end > self.start else None
+
+    def push(self, x_coord, y_coord, length):
+        """
+        appends the new head and drops squares from the tail until the body is at most length long
+        """
+
+        if self.end == self.squares.shape[0]:
+            live = self.end - self.start
+            if 2 * live > self.squares.shape[0]:
+                squares = np.zeros((2 * self.squares.shape[0], 2), dtype=self.squares.dtype)
+                squares[:live] = self.squares[self.start:self.end]
+                self.squares = squares
+            else: self.squares[:live] = self.squares[self.start:self.end]
+            self.start, self.end = 0, live
+
+        self.squares[self.end] = (round(x_coord), round(y_coord))
+        self.end += 1
+        cell = self.cell(x_coord, y_coord)
+        if cell is not None:
+            self.occupancy[cell] += 1
+            if self.journal is not None: self.journal = (self.journal, self.journal[1] + 1, cell, 1)
+            if self.occupancy[cell] == 1:
+                for listener in self.listeners: listener.occupy(x_coord, y_coord)
+
+        while self.end - self.start > length:
+            x_tail, y_tail = self.squares[self.start].tolist()
+            self.start += 1
+            cell = self.cell(x_tail, y_tail)
+            if cell is not None:
+                self.occupancy[cell] -= 1
+                if self.journal is not None: self.journal = (self.journal, self.journal[1] + 1, cell, -1)
+                if self.occupancy[cell] == 0:
+                    if self.sparse: del self.occupancy[cell]
+                    for listener in self.listeners: listener.release(x_tail, y_tail)
+
+    def snapshot(self):
+        # a copy of the live squares and the current entry of the journal, which has to be started (see game_state.clone)
+        return self.array().copy(), self.journal
+
+    def restore(self, state):
+        """
+        puts the body back in the state of the snapshot, the listeners being restored on their own (see game_state.restore)
+        the changes of the counter between the current entry of the journal and the snapshot's are undone or done again
+        """
+
+        squares, journal = state
+        undone, redone = journal_path(self.journal, journal)
+        for step, entries in ((-1, undone), (1, redone)):
+            for previous, depth, cell, change in entries:
+                self.occupancy[cell] += step * change
+                if self.sparse and self.occupancy[cell] == 0: del self.occupancy[cell]
+        self.journal = journal
+
+        if self.squares.shape[0] < len(squares): self.squares = np.zeros((2 * len(squares), 2), dtype=self.squares.dtype)
+        self.squares[:len(squares)] = squares
+        self.start, self.end = 0, len(squares)
+
+class spawn_index():
+    """
+    class responsible for the cells where the food or the cop can appear
+    the candidates are the snake_block cells of the screen that are far enough from the obstacles (no pixel of the probe
+    around the cell is part of an obstacle), all checked at once on the obstacle grid when the index is built
+    the legal cells that are currently free are kept in a flat array, with the position of every cell in that array,
+    so that removing a cell (swapping the last one into its slot), adding it back and drawing a free cell are all constant time
+    the index listens to the snake's body so that cells covered by the snake are never drawn
+    while the game has snapshots, every removal and addition is journaled, a snapshot being the last entry of the journal
+    and a restore undoing and doing again the entries between the current one and the snapshot's instead of copying the arrays
+    """
+
+    def __init__(self, borders, probe):
+        self.columns = dis_width // snake_block
+        self.rows = dis_height // snake_block
+        self.cells = np.zeros(self.columns * self.rows, dtype=np.int32)
+        self.position = np.zeros(self.columns * self.rows, dtype=np.int32)
+        self.reset(borders, probe)
+
+    def reset(self, borders, probe):
+        """
+        indexes the legal cells of the obstacles given, in the arrays of the index (so that it can be used by another game)
+        """
 
-# non-crossable borders initialization (will be filled with tuples of coordinates)
-borders = []
+        self.legal = ~borders.cells_blocked(probe)
+
+        legal_cells = np.flatnonzero(self.legal)
+        self.size = len(legal_cells)
+        self.cells[:self.size] = legal_cells
+        self.position.fill(-1)
+        self.position[legal_cells] = np.arange(self.size)
+        self.journal = None # last entry journaled, as (previous entry, depth, cell, slot or -1 for an addition), None when not journaling
+
+    def cell(self, x_coord, y_coord):
+        column = round(x_coord) // snake_block
+        row = round(y_coord) // snake_block
+        if 0 <= column < self.columns and 0 <= row < self.rows: return column * self.rows + row
+        return None
+
+    def occupy(self, x_coord, y_coord):
+        cell = self.cell(x_coord, y_coord)
+        if cell is None or self.position[cell] < 0: return
+
+        if self.journal is not None: self.journal = (self.journal, self.journal[1] + 1, cell, int(self.position[cell]))
+        self.remove(cell)
+
+    def release(self, x_coord, y_coord):
+        cell = self.cell(x_coord, y_coord)
+        if cell is None or not self.legal[cell] or self.position[cell] >= 0: return
+
+        if self.journal is not None: self.journal = (self.journal, self.journal[1] + 1, cell, -1)
+        self.add(cell)
+
+    def remove(self, cell):
+        slot = self.position[cell]
+        last = self.cells[self.size - 1]
+        self.cells[slot] = last
+        self.position[last] = slot
+        self.position[cell] = -1
+        self.size -= 1
+
+    def add(self, cell):
+        self.cells[self.size] = cell
+        self.position[cell] = self.size
+        self.size += 1
+
+    def clear_around(self, x_coord, y_coord, distance):
+        """
+        takes the free cells within distance cells of the position (on both axes) out of the index, returns their
+        coordinates so that they can be released once the draws they should not take part in are done
+        """
+
+        cleared = []
+        for x_offset in range(-distance, distance + 1):
+            for y_offset in range(-distance, distance + 1):
+                x_cell = (round(x_coord) + x_offset * snake_block) % (self.columns * snake_block)
+                y_cell = (round(y_coord) + y_offset * snake_block) % (self.rows * snake_block)
+                cell = self.cell(x_cell, y_cell)
+                if cell is None or self.position[cell] < 0: continue
+
+                self.occupy(x_cell, y_cell)
+                cleared.append((x_cell, y_cell))
+
+        return cleared
+
+    def snapshot(self):
+        # the current entry of the journal, which has to be started (see game_state.clone)
+        return self.journal
+
+    def restore(self, state):
+        """
+        puts the index back in the state of the snapshot, the order of the free cells included since the draws depend on it:
+        the entries since the last one the snapshot and the index have in common are undone, then the ones leading to the
+        snapshot are done again
+        """
+
+        undone, redone = journal_path(self.journal, state)
+        for previous, depth, cell, slot in undone:
+            if slot < 0: self.remove(cell)
+            elif slot == self.size: self.add(cell)
+            else:
+                # the cell goes back to its slot, the cell moved there going back to the end
+                moved = self.cells[slot]
+                self.cells[self.size] = moved
+                self.position[moved] = self.size
+                self.cells[slot] = cell
+                self.position[cell] = slot
+                self.size += 1
+        for previous, depth, cell, slot in redone:
+            if slot < 0: self.add(cell)
+            else: self.remove(cell)
+        self.journal = state
+
+    def sample(self, rng):
+        """
+        draws a free legal cell uniformly from the random stream given, returns its coordinates or None if the board is full
+        """
+
+        if self.size == 0: return None
+        column, row = divmod(int(self.cells[rng.randrange(self.size)]), self.rows)
+        return column * snake_block, row * snake_block
+
+class weighted_sampler():
+    """
+    class responsible for drawing among a few choices with fixed weights
+    the cumulative weights are computed once, so that a draw is a single uniform number and a bisection
+    """
+
+    def __init__(self, choices, weights):
+        self.choices = list(choices)
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def draw(self, rng):
+        return self.choices[bisect.bisect(self.cumulative, rng.random() * self.cumulative[-1])]
+
+food_sampler = weighted_sampler(foodDicts.keys(), [0.6, 0.3, 0.1])
+police_sampler = weighted_sampler(police_random_moves, police_random_weights)
+
+class distance_field():
+    """
+    class responsible for the shortest path distances from the snake's head, used by the pathfinding cop
+    the screen is cut into snake_block cells, wrapping around like the snake does, and a cell is passable
+    if a cop standing on it would not be close to an obstacle (the same corners probe as is_close_to_obstacles)
+    the breadth-first search rooted at the head is time-sliced: each frame expands at most `budget` cells,
+    and once a search is complete it replaces the field the cop reads, a new one only starting once the field is
+    field_refresh moves old, so that the cost per frame is strictly bounded while the cop only ever does constant-time lookups
+    in between the field is repaired rather than searched again: the sides of the board having an even number of cells,
+    a move of the head changes every distance by exactly one (less one where a shortest path goes through the new head),
+    so the search records which of the first moves from its root start a shortest path to every cell and a lookup adds
+    up the moves made since then, which holds away from the path of the head, where the cop makes its greedy move anyway
+    """
+
+    # the four neighbours of every cell (left, right, up and down, cells being numbered column by column), the same
+    # for every level since the board wraps around, the obstacles being told apart by the values the searches start from
+    neighbours = None
+    neighbour_lists = None
+
+    def __init__(self, borders, budget=field_budget, refresh=None):
+        self.budget = budget
+        self.refresh = field_refresh if refresh is None else refresh
+        self.columns = dis_width // snake_block
+        self.rows = dis_height // snake_block
+        if distance_field.neighbours is None:
+            cells = np.arange(self.columns * self.rows)
+            column, row = np.divmod(cells, self.rows)
+            distance_field.neighbours = np.stack([(column - 1) % self.columns * self.rows + row, (column + 1) % self.columns * self.rows + row,
+                                                  column * self.rows + (row - 1) % self.rows, column * self.rows + (row + 1) % self.rows], axis=1).astype(np.int32)
+            distance_field.neighbour_lists = distance_field.neighbours.tolist()
+
+        # passability of every cell, probed at once on the obstacle grid: a search starts from -1 on the passable cells
+        # and from -2 on the other ones, which it never reaches
+        self.unreached = np.where(borders.cells_blocked(corners_probe), -2, -1).tolist()
+        self.no_moves = [0] * (self.columns * self.rows)
+
+        # a completed search is never written again (every search fills lists of its own), so that snapshots share it
+        self.head = None
+        self.distances = None
+        self.firsts = None # for every cell, the bits of the first moves from the root starting a shortest path to it
+        self.moves = (0, 0, 0, 0) # moves of the head in every direction since the root of the distances
+        self.age = 0 # moves since the root of the current distances was taken
+        self.searching = None
+        self.search_firsts = None
+        self.shared = False # whether the lists of the search in progress are shared with a snapshot, to be copied before going on
+        self.search_moves = (0, 0, 0, 0)
+        self.queue = deque()
+        self.search_age = 0
+        self.distances_array = None # array copies of the distances and of the first moves, only made once per search
+        self.firsts_array = None
+        self.array_source = None
+
+    def cell(self, x_coord, y_coord):
+        return (round(x_coord) // snake_block % self.columns) * self.rows + round(y_coord) // snake_block % self.rows
+
+    def start(self, root):
+        self.searching = list(self.unreached)
+        self.search_firsts = list(self.no_moves)
+        self.shared = False
+        self.search_moves = (0, 0, 0, 0)
+        self.search_age = 0
+        if self.searching[root] == -2: return
+
+        self.searching[root] = 0
+        for direction, neighbour in enumerate(self.neighbour_lists[root]):
+            if self.searching[neighbour] == -1:
+                self.searching[neighbour] = 1
+                self.queue.append(neighbour)
+            if self.searching[neighbour] == 1: self.search_firsts[neighbour] |= 1 << direction
+
+    def update(self, x_coord, y_coord):
+        """
+        called once per frame with the snake's head, records its move and resumes the current search for at most budget cells
+        nothing is done while the head stays on the same cell and no search is under way
+        """
+
+        head = self.cell(x_coord, y_coord)
+        if head != self.head:
+            previous, self.head = self.head, head
+            neighbours = self.neighbour_lists[previous] if previous is not None else ()
+            if head in neighbours:
+                direction = neighbours.index(head)
+                self.moves = tuple(count + (move == direction) for move, count in enumerate(self.moves))
+                self.search_moves = tuple(count + (move == direction) for move, count in enumerate(self.search_moves))
+                self.age += 1
+                self.search_age += 1
+            else:
+                # a jump of the head cannot be repaired, the field is searched again from scratch
+                self.distances = None
+                self.queue.clear()
+
+        if not self.queue:
+            if self.distances is not None and self.age < self.refresh: return
+            self.start(head)
+        if self.shared:
+            self.searching, self.search_firsts = list(self.searching), list(self.search_firsts)
+            self.shared = False
+
+        searching = self.searching
+        firsts = self.search_firsts
+        neighbours = self.neighbour_lists
+        queue = self.queue
+        for expansion in range(self.budget):
+            if not queue: break
+
+            cell = queue.popleft()
+            distance = searching[cell] + 1
+            first = firsts[cell]
+            for neighbour in neighbours[cell]:
+                if searching[neighbour] == -1:
+                    searching[neighbour] = distance
+                    firsts[neighbour] = first
+                    queue.append(neighbour)
+                elif searching[neighbour] == distance: firsts[neighbour] |= first
+
+        # the search is complete, it becomes the field read by the cop
+        if not queue:
+            self.distances, self.firsts, self.moves, self.age = self.searching, self.search_firsts, self.search_moves, self.search_age
+
+    def lookup(self, x_coord, y_coord):
+        """
+        distance in cells from the head to the position (repaired from the root of the field), None if unknown or unreachable
+        """
+
+        if self.distances is None: return None
+        cell = self.cell(x_coord, y_coord)
+        distance = self.distances[cell]
+        if distance < 0: return None
+
+        first = self.firsts[cell]
+        left, right, up, down = self.moves
+        closer = (first & 1) * left + (first >> 1 & 1) * right + (first >> 2 & 1) * up + (first >> 3 & 1) * down
+        return max(0, distance + self.age - 2 * closer)
+
+    def lookup_array(self, x_coords, y_coords):
+        """
+        vectorized lookup of arrays of positions, -1 standing for unknown or unreachable
+        """
+
+        if self.distances is None: return np.full(np.shape(x_coords), -1)
+        if self.array_source is not self.distances:
+            self.distances_array = np.array(self.distances)
+            self.firsts_array = np.array(self.firsts)
+            self.array_source = self.distances
+
+        columns = np.rint(x_coords).astype(np.intp) // snake_block % self.columns
+        rows = np.rint(y_coords).astype(np.intp) // snake_block % self.rows
+        cells = columns * self.rows + rows
+        distances = self.distances_array[cells]
+        firsts = self.firsts_array[cells]
+
+        closer = np.zeros(np.shape(cells), dtype=np.int64)
+        for direction, count in enumerate(self.moves):
+            if count: closer += (firsts >> direction & 1) * count
+        return np.where(distances >= 0, np.maximum(0, distances + self.age - 2 * closer), -1)
+
+    def snapshot(self):
+        # the completed distances are shared, and so are the lists of a search in progress until the field goes on with it
+        searching = (self.searching, self.search_firsts) if self.queue else None
+        self.shared = self.shared or searching is not None
+        return self.head, self.distances, self.firsts, self.moves, self.age, searching, tuple(self.queue), self.search_moves, self.search_age
+
+    def restore(self, state):
+        self.head, self.distances, self.firsts, self.moves, self.age, searching, queue, self.search_moves, self.search_age = state
+        self.searching, self.search_firsts = searching if searching is not None else (None, None)
+        self.shared = searching is not None
+        self.queue = deque(queue)
+
+def obstacles_surface(covered, color):
+    """
+    draws the covered pixels in the color over black
+    the mask is used as is as the pixels of an 8 bits surface whose palette maps 0 to black and 1 to the color,
+    which spares building an RGB array, the surface being then converted to the format of the display if there is one
+    """
+
+    surface = pygame.surfarray.make_surface(covered.view(np.uint8))
+    surface.set_palette_at(0, black)
+    surface.set_palette_at(1, color)
+    return surface.convert() if pygame.display.get_surface() is not None else surface
 
 class pattern():
     """
@@ -69,15 +695,17 @@ class pattern():
     the pattern created is randomly generated and its complexity is positively correlated with the difficulty
     several points are first generated to form a grid - those points will be the center of future obstacle objects
     each object is then attributed random dimensions, all of which is finally displayed on the screen
-    each point of coordinates of the pattern is saved in a list, in an effort to generalize its non-crossable property
+    each point of coordinates of the pattern is written into the obstacle grid, in an effort to generalize its non-crossable property
     """
 
-    def __init__(self, difficulty, dis_width, dis_height, snake_block):
+    def __init__(self, difficulty, dis_width, dis_height, snake_block, borders=None, rng=None):
         self.color = grey
         self.difficulty = difficulty
         self.dis_width = dis_width
         self.dis_height = dis_height
         self.snake_block = snake_block
+        self.borders = borders if borders is not None else obstacle_grid(dis_width, dis_height)
+        self.rng = rng if rng is not None else random.Random()
 
     def build_grid(self):
         """
@@ -91,26 +719,28 @@ class pattern():
         for x_case in range (grid_format):
             for y_case in range(grid_format):
                 if (x_case, y_case) != (int((grid_format)/2), int((grid_format)/2)): 
-                    x_coord = random.randint(int(self.dis_width / grid_format * x_case), int(self.dis_width / grid_format * (1 + x_case)))
-                    y_coord = random.randint(int(self.dis_height / grid_format * y_case), int(self.dis_height / grid_format * (1 + y_case)))
+                    x_coord = self.rng.randint(int(self.dis_width / grid_format * x_case), int(self.dis_width / grid_format * (1 + x_case)))
+                    y_coord = self.rng.randint(int(self.dis_height / grid_format * y_case), int(self.dis_height / grid_format * (1 + y_case)))
                     grid.append([x_coord, y_coord])
 
         return grid
     
     def build_rectangle(self, x_coord, y_coord, obstacle_height, obstacle_width):
-        for x in range(x_coord - obstacle_width, x_coord + obstacle_width + 1):
-            for y in range(y_coord - obstacle_height, y_coord + obstacle_height + 1):
-                borders.append([x, y])
+        mask = np.ones((2 * obstacle_width + 1, 2 * obstacle_height + 1), dtype=bool)
+        self.borders.add_mask(x_coord - obstacle_width, y_coord - obstacle_height, mask)
 
     def build_diamond(self, x_coord, y_coord, obstacle_height):
         if obstacle_height % 2 == 0: obstacle_height += 1
 
-        for x in range(x_coord - obstacle_height, x_coord + obstacle_height + 1):
-            for y in range(y_coord - obstacle_height + abs(x - x_coord), y_coord + obstacle_height - abs(x - x_coord)):
-                borders.append([x, y])
+        # each column x spans the rows from y_coord - obstacle_height + |x - x_coord| (included) to y_coord + obstacle_height - |x - x_coord| (excluded)
+        x_offsets = np.abs(np.arange(-obstacle_height, obstacle_height + 1))[:, None]
+        y_offsets = np.arange(-obstacle_height, obstacle_height)[None, :]
+        mask = (y_offsets >= x_offsets - obstacle_height) & (y_offsets < obstacle_height - x_offsets)
+        self.borders.add_mask(x_coord - obstacle_height, y_coord - obstacle_height, mask)
     
     def block_coordinates(self):
-        value = stats.norm.cdf(np.random.normal())
+        # uniform draw in [0, 1], taken as the normal cdf of a gaussian draw so that every seed keeps building the same level
+        value = 0.5 * math.erfc(-self.rng.gauss(0, 1) / math.sqrt(2))
 
         if self.difficulty == "easy": return int(15 + 10 * value)
         if self.difficulty == "medium": return int(20 + 14 * value)
@@ -123,7 +753,7 @@ class pattern():
         """
 
         if self.difficulty != "hard": form = "rectangle" 
-        else: form = random.choice(["rectangle", "diamond"])
+        else: form = self.rng.choice(["rectangle", "diamond"])
 
         # random block dimensions generator
         obstacle_height = self.block_coordinates()
@@ -138,11 +768,352 @@ class pattern():
         grid = self.build_grid()
         for ele in grid: self.build_block(ele[0], ele[1])
 
-    def print_pattern(self, x_coord, y_coord):
-        pygame.draw.rect(dis, self.color, [x_coord, y_coord, self.snake_block, self.snake_block])
+    def print_pattern(self, surface):
+        """
+        the whole pattern is turned into a single surface and blitted at once
+        the background color is used as a color key so that only the obstacles are copied onto the surface
+        """
+
+        covered = self.borders.rendering_mask(self.dis_width, self.dis_height, self.snake_block)
+        pattern_surface = obstacles_surface(covered, self.color)
+        pattern_surface.set_colorkey(black)
+        surface.blit(pattern_surface, (0, 0))
 
     def destroy_pattern(self):
-        borders.clear()
+        self.borders.clear()
+
+def unpack(bits, shape):
+    return np.unpackbits(bits, count=int(np.prod(shape))).reshape(shape).view(bool)
+
+class level():
+    """
+    class holding a built level of the single screen board: its obstacle cells (margin included) and the pixels its
+    obstacles cover on the screen, both packed 8 cells per byte so that keeping many levels around costs little
+    a level about to be played is also kept prepared: unpacked on an obstacle grid whose probes are answered, and drawn
+    on a background surface, so that a game of the level only copies the grid and its renderer draws over that surface
+    """
+
+    def __init__(self, cells, cells_shape, covered, covered_shape):
+        self.cells = cells
+        self.cells_shape = tuple(cells_shape)
+        self.covered = covered
+        self.covered_shape = tuple(covered_shape)
+        self.grid = None # the prepared grid and background, None until the level is prepared (or once it is released)
+        self.background = None
+
+    def prepare(self):
+        # the prepared grid of the level, unpacked and probed for the spawn indexes and the distance field the first time
+        grid = self.grid
+        if grid is None:
+            grid = obstacle_grid(dis_width, dis_height)
+            grid.cells[:] = unpack(self.cells, self.cells_shape)
+        for probe in (food_probe, cross_probe, corners_probe): grid.cells_blocked(probe)
+        self.grid = grid
+        return grid
+
+    def surface(self):
+        # the obstacles of the level drawn over black, used as is as the background of the renderer (which never draws on it)
+        background = self.background
+        if background is None: background = self.background = obstacles_surface(unpack(self.covered, self.covered_shape), grey)
+        return background
+
+    def release(self):
+        self.grid = self.background = None
+
+    def copy_to(self, grid):
+        prepared = self.prepare()
+        grid.cells[:] = prepared.cells
+        grid.probed = dict(prepared.probed)
+
+def generate_level(difficulty, seed):
+    """
+    builds the level of the game of the given seed on its own grid, from the same stream as game_state would
+    (the grid being kept as the prepared grid of the level)
+    """
+
+    grid = obstacle_grid(dis_width, dis_height)
+    level_rng = random.Random(random.Random(seed).getrandbits(64))
+    our_pattern = pattern(difficulty=difficulty, dis_width=dis_width, dis_height=dis_height, snake_block=snake_block, borders=grid, rng=level_rng)
+    our_pattern.build_pattern()
+    covered = grid.rendering_mask(dis_width, dis_height, snake_block)
+    our_level = level(np.packbits(grid.cells), grid.cells.shape, np.packbits(covered), covered.shape)
+    our_level.grid = grid
+    return our_level
+
+class level_cache():
+    """
+    class responsible for having the levels ready before the games start, so that restarting a game is nearly instant
+    levels are keyed by (difficulty, grid format, seed) and looked up in memory (the level_memory most recently used ones), then on
+    disk where every level generated is written as a compressed .npz of its bits, and generated as a last resort
+    a background thread keeps pool_size levels of fresh seeds ready per difficulty, take handing out one of them
+    the thread only builds levels on grids of its own and prepares them (see level.prepare), the games copying the
+    prepared grid of their level into their own grid and drawing over its prepared background
+    """
+
+    def __init__(self, directory=None, memory=level_memory, pool_size=level_pool_size, max_files=level_files):
+        self.directory = directory
+        self.memory = memory
+        self.pool_size = pool_size
+        self.max_files = max_files
+        self.levels = OrderedDict()
+        self.pools = {difficulty: deque() for difficulty in speed}
+        self.condition = threading.Condition()
+        self.seeds = random.Random()
+        self.thread = None
+        self.taken = 0 # when a level was last taken from the pools
+
+    def key(self, difficulty, seed):
+        return difficulty, init_grid_format[difficulty], seed
+
+    def path(self, difficulty, seed):
+        # the grid format and the version of the level generation are part of the name, so that a level built by
+        # other rules (a previous version of the game) is never read
+        return os.path.join(self.directory, f"{difficulty}-{init_grid_format[difficulty]}-v{level_version}-{seed}.npz")
+
+    def read(self, difficulty, seed):
+        # the level written on disk, None when there is none (or when it is not readable, the damaged file being removed)
+        if self.directory is None: return None
+        path = self.path(difficulty, seed)
+        try:
+            with np.load(path) as data:
+                our_level = level(data["cells"], data["cells_shape"], data["covered"], data["covered_shape"])
+            if our_level.cells_shape == (dis_width + 2 * grid_margin, dis_height + 2 * grid_margin): return our_level
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile, zlib.error):
+            pass
+
+        try: os.remove(path)
+        except OSError: pass
+        return None
+
+    def write(self, difficulty, seed, our_level):
+        # written to a temporary file first, so that a level file is always whole, the cache being best effort
+        if self.directory is None: return
+        path = self.path(difficulty, seed)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, "wb") as level_file:
+                np.savez_compressed(level_file, cells=our_level.cells, cells_shape=np.array(our_level.cells_shape),
+                                    covered=our_level.covered, covered_shape=np.array(our_level.covered_shape))
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    def prune(self):
+        # removes the oldest level files beyond max_files
+        if self.directory is None or not os.path.isdir(self.directory): return
+        paths = [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".npz")]
+        if len(paths) <= self.max_files: return
+
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_files]:
+            try: os.remove(path)
+            except OSError: pass
+
+    def remember(self, key, our_level):
+        # the levels used the least recently are forgotten, or only kept packed
+        with self.condition:
+            self.levels[key] = our_level
+            self.levels.move_to_end(key)
+            if len(self.levels) > self.memory: self.levels.popitem(last=False)
+            for old_level in list(self.levels.values())[:-level_prepared]: old_level.release()
+
+    def load(self, difficulty, seed):
+        """
+        the level of the game of the given seed, from memory, from disk or generated (and written) as a last resort
+        """
+
+        key = self.key(difficulty, seed)
+        with self.condition:
+            our_level = self.levels.get(key)
+            if our_level is not None:
+                self.levels.move_to_end(key)
+                return our_level
+
+        our_level = self.read(difficulty, seed)
+        if our_level is None:
+            our_level = generate_level(difficulty, seed)
+            self.write(difficulty, seed, our_level)
+
+        self.remember(key, our_level)
+        return our_level
+
+    def take(self, difficulty):
+        """
+        the seed of a new game whose level is ready, or of a level yet to be built when the pool is empty
+        """
+
+        with self.condition:
+            if self.pools[difficulty]:
+                seed, our_level = self.pools[difficulty].popleft()
+                self.taken = time.perf_counter()
+                self.condition.notify()
+            else:
+                seed, our_level = self.seeds.getrandbits(32), None
+
+        if our_level is not None: self.remember(self.key(difficulty, seed), our_level)
+        return seed
+
+    def missing(self):
+        # the difficulty whose pool is the emptiest, None when every pool is full
+        difficulty = min(self.pools, key=lambda difficulty: len(self.pools[difficulty]))
+        return difficulty if len(self.pools[difficulty]) < self.pool_size else None
+
+    def prefetch(self):
+        # body of the background thread, filling the pools and waiting for a level to be taken when they are full
+        # (the background of a level is drawn here as well once the display is open, to be of its format)
+        self.prune()
+        while True:
+            with self.condition:
+                difficulty = self.missing()
+                while difficulty is None:
+                    self.condition.wait()
+                    difficulty = self.missing()
+                seed = self.seeds.getrandbits(32)
+                delay = self.taken + level_delay - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+
+            our_level = self.read(difficulty, seed)
+            if our_level is None:
+                our_level = generate_level(difficulty, seed)
+                self.write(difficulty, seed, our_level)
+            our_level.prepare()
+            if pygame.display.get_surface() is not None: our_level.surface()
+
+            with self.condition: self.pools[difficulty].append((seed, our_level))
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.prefetch, name="level prefetch", daemon=True)
+            self.thread.start()
+
+class chunked_grid():
+    """
+    class responsible for the obstacles of a large world, made of columns x rows chunks of the size of the screen
+    each chunk is a level of its own, built by a pattern on its own obstacle_grid from a seed derived from the world's seed
+    and the position of the chunk, so that a chunk is only generated when something looks at it and can be forgotten
+    and generated again identically: at most `capacity` chunks (and `surfaces` rasterized chunks) are kept, the least
+    recently used ones being dropped, which makes the memory depend on the screen rather than on the size of the world
+    it answers the same lookups as obstacle_grid, positions wrapping around the world like the snake does
+    """
+
+    def __init__(self, difficulty, columns, rows, seed, capacity=chunk_capacity, surfaces=chunk_surfaces):
+        self.difficulty = difficulty
+        self.columns = columns
+        self.rows = rows
+        self.seed = seed
+        self.capacity = capacity
+        self.width = columns * dis_width
+        self.height = rows * dis_height
+        self.patterns = OrderedDict()
+        self.surfaces = OrderedDict()
+        self.surfaces_capacity = surfaces
+
+    def key(self, column, row):
+        return column % self.columns, row % self.rows
+
+    def chunk(self, column, row):
+        # the pattern of the chunk, generated if it is not in memory
+        key = self.key(column, row)
+        our_pattern = self.patterns.get(key)
+        if our_pattern is not None:
+            self.patterns.move_to_end(key)
+            return our_pattern
+
+        our_pattern = pattern(difficulty=self.difficulty, dis_width=dis_width, dis_height=dis_height, snake_block=snake_block,
+                              borders=obstacle_grid(dis_width, dis_height), rng=random.Random(f"{self.seed}:{key[0]}:{key[1]}"))
+        our_pattern.build_pattern()
+        self.patterns[key] = our_pattern
+        if len(self.patterns) > self.capacity: self.patterns.popitem(last=False)
+        return our_pattern
+
+    def surface(self, column, row):
+        # the chunk rasterized on a surface of the size of the screen
+        key = self.key(column, row)
+        chunk_surface = self.surfaces.get(key)
+        if chunk_surface is not None:
+            self.surfaces.move_to_end(key)
+            return chunk_surface
+
+        chunk_surface = pygame.Surface((dis_width, dis_height))
+        chunk_surface.fill(black)
+        self.chunk(column, row).print_pattern(chunk_surface)
+        self.surfaces[key] = chunk_surface
+        if len(self.surfaces) > self.surfaces_capacity: self.surfaces.popitem(last=False)
+        return chunk_surface
+
+    def prefetch(self, left, top):
+        """
+        generates at most one missing chunk among the ones within prefetch_distance of the screen whose top left corner
+        is given, so that crossing into a new chunk does not stall a frame
+        """
+
+        for column in range((left - prefetch_distance) // dis_width, (left + dis_width + prefetch_distance) // dis_width + 1):
+            for row in range((top - prefetch_distance) // dis_height, (top + dis_height + prefetch_distance) // dis_height + 1):
+                if self.key(column, row) not in self.patterns:
+                    self.chunk(column, row)
+                    return
+
+    def is_blocked(self, x_coord, y_coord):
+        x_coord = round(x_coord) % self.width
+        y_coord = round(y_coord) % self.height
+        return self.chunk(x_coord // dis_width, y_coord // dis_height).borders.is_blocked(x_coord % dis_width, y_coord % dis_height)
+
+    def any_blocked(self, x_coord, y_coord, probe):
+        for x_offset, y_offset in probe:
+            if self.is_blocked(x_coord + x_offset, y_coord + y_offset): return True
+
+        return False
+
+    def blocked(self, x_coords, y_coords):
+        """
+        vectorized lookup of arrays of positions, each chunk concerned being read once
+        """
+
+        x_coords = np.rint(x_coords).astype(np.intp) % self.width
+        y_coords = np.rint(y_coords).astype(np.intp) % self.height
+        keys = (x_coords // dis_width) * self.rows + y_coords // dis_height
+
+        result = np.zeros(np.shape(x_coords), dtype=bool)
+        for key in np.unique(keys).tolist():
+            inside = keys == key
+            result[inside] = self.chunk(*divmod(key, self.rows)).borders.blocked(x_coords[inside] % dis_width, y_coords[inside] % dis_height)
+        return result
+
+class world_spawns():
+    """
+    class responsible for the cells where the food or the cop can appear in a large world
+    there is no index of the free cells of a world, so cells are drawn within the screen around the snake's head until
+    one is far enough from the obstacles (the probe) and free from the snake, a bounded number of times
+    the cells within clearance cells of the head (on both axes) are never taken
+    """
+
+    def __init__(self, grid, probe, our_snake, clearance=0):
+        self.grid = grid
+        self.probe = probe
+        self.snake = our_snake
+        self.clearance = clearance
+
+    def occupy(self, x_coord, y_coord):
+        pass
+
+    def release(self, x_coord, y_coord):
+        pass
+
+    def sample(self, rng):
+        left = round(self.snake.x_coord) - dis_width // 2
+        top = round(self.snake.y_coord) - dis_height // 2
+        for attempt in range(world_spawn_attempts):
+            column, row = rng.randrange(dis_width // snake_block), rng.randrange(dis_height // snake_block)
+            if abs(column - dis_width // snake_block // 2) <= self.clearance and abs(row - dis_height // snake_block // 2) <= self.clearance: continue
+
+            x_coord = (left + column * snake_block) % self.grid.width
+            y_coord = (top + row * snake_block) % self.grid.height
+            if not self.grid.any_blocked(x_coord, y_coord, self.probe) and self.snake.surface.count(x_coord, y_coord) == 0: return x_coord, y_coord
+
+        return None
 
 class food():
     """
@@ -151,24 +1122,32 @@ class food():
     handles different types of food and their specifics
     """
 
+    __slots__ = ("x_coord", "y_coord", "foodtype", "snake_speed")
+
     def __init__(self, snake_speed):
+        self.reset(snake_speed)
+
+    def reset(self, snake_speed):
         self.x_coord = None
         self.y_coord = None
-        self.food_type = None
+        self.foodtype = None
         self.snake_speed = snake_speed
 
-    def generate(self):
-        self.x_coord = round(random.randrange(0, dis_width - snake_block) / 10.0) * 10.0
-        self.y_coord = round(random.randrange(0, dis_height - snake_block) / 10.0) * 10.0
-        if [self.x_coord + 1.5 * snake_block, self.y_coord + 1.5 * snake_block] in borders: self.generate()
-        if [self.x_coord - 1.5 * snake_block, self.y_coord + 1.5 * snake_block] in borders: self.generate()
-        if [self.x_coord + 1.5 * snake_block, self.y_coord - 1.5 * snake_block] in borders: self.generate()
-        if [self.x_coord - 1.5 * snake_block, self.y_coord - 1.5 * snake_block] in borders: self.generate()
+    def generate(self, spawns, rng):
+        """
+        the food is drawn among the free cells that are far enough from the obstacles (see spawn_index)
+        if the board happens to be full, no food is placed
+        """
 
-        self.foodtype = np.random.choice(list(foodDicts.keys()), 1, p=[0.6, 0.3, 0.1])[0]
+        cell = spawns.sample(rng)
+        if cell is not None: self.x_coord, self.y_coord = cell
+        else: self.x_coord = self.y_coord = None
 
-    def handle_accelerators(self, accelerator):
-        if datetime.now() > accelerator[0]:
+        self.foodtype = food_sampler.draw(rng)
+
+    def handle_accelerators(self, accelerator, tick):
+        # the accelerators hold the tick at which each speed boost ends
+        if tick >= accelerator[0]:
             accelerator.pop(0)
             self.snake_speed /= fasterMultiplier
 
@@ -178,8 +1157,11 @@ class snake():
     controls its position and moves at every frame, depending on the potential action of the user
     encompasses multiple tests of illegal positions (snake touching its tail, snake touching obstacles)
     as well as legal positions (snake eating food or snake going through the screen)
+    the coordinates of the snake are integer pixels, on the snake_block cells
     """
 
+    __slots__ = ("color", "x_coord", "y_coord", "x_shift", "y_shift", "length", "surface", "accelerator")
+
     def __init__(self, x_coord, y_coord, x_shift, y_shift, length, surface, accelerator):
         self.color = dark_green
         self.x_coord = x_coord
@@ -210,98 +1192,115 @@ class snake():
         self.x_coord += self.x_shift
         self.y_coord += self.y_shift
 
+    def direction(self):
+        # direction of the current move, None while the snake has not moved yet
+        if self.y_shift < 0: return "up"
+        if self.y_shift > 0: return "down"
+        if self.x_shift < 0: return "left"
+        if self.x_shift > 0: return "right"
+        return None
+
     def is_hitting_himself(self):
-        if [self.x_coord, self.y_coord] in self.surface[:-1]: return True
+        # the head is on its own body if its cell is occupied by another square than the last one pushed
+        count = self.surface.count(self.x_coord, self.y_coord)
+        if count > 1 or (count == 1 and self.surface.last() != [round(self.x_coord), round(self.y_coord)]): return True
 
-    def is_hitting_obstacle(self):
+    def is_hitting_obstacle(self, borders):
         """
         we check if any of the four corners of the snake's head in touching an obstacle
-        to that end we verify that none of those points are inside the list of coordinates deemed as obstacles
+        to that end we verify that none of those points are flagged in the obstacle grid of the game
         """
 
-        if [self.x_coord + snake_block, self.y_coord] in borders: return True
-        if [self.x_coord - snake_block, self.y_coord] in borders: return True
-        if [self.x_coord, self.y_coord + snake_block] in borders: return True
-        if [self.x_coord, self.y_coord - snake_block] in borders: return True
+        if borders.any_blocked(self.x_coord, self.y_coord, cross_probe): return True
 
-    def is_breaching(self):
-        if self.x_coord >= dis_width:
+    def is_breaching(self, world_width, world_height):
+        if self.x_coord >= world_width:
             self.x_coord = 0
             left
         elif self.x_coord < 0:
-            self.x_coord = dis_width
+            self.x_coord = world_width
             right
-        if self.y_coord >= dis_height:
+        if self.y_coord >= world_height:
             self.y_coord = 0
             up
         elif self.y_coord < 0:
-            self.y_coord = dis_height
+            self.y_coord = world_height
             down
 
-    def ate_food(self, type_food):
+    def ate_food(self, type_food, boost_end=None):
         if type_food == "double": self.length += 2 
         else: self.length += 1
 
         if type_food == "fast":
-            self.accelerator.append(datetime.now() + timedelta(seconds=secondsMultiplier))
+            self.accelerator.append(boost_end)
 
     def builder(self):
-        self.surface.append([self.x_coord, self.y_coord])
-        if len(self.surface) > self.length: del self.surface[0]
-
-        self.move()
+        self.surface.push(self.x_coord, self.y_coord, self.length)
 
-    def move(self):
-        for x in self.surface:
-            pygame.draw.rect(dis, self.color, [x[0], x[1], snake_block, snake_block])
- 
 class police(snake):
     """
     class responsible for interacting with the police object that chases the snake
     because its structure resembles a lot the snake, we decided to apply inheritancy here
     handles its movements depending on the position of the snake, as well as some tests for illegal positions
     at each frame the future position is decided by an algorithm that computes the move that minimizes the distance
-    to the snake (80% best move and 20% random move), while checking if that move is legal, ie not within an obstacle
+    to the snake (80% best move and 20% random move by default), while checking if that move is legal, ie not within an obstacle
+    in "greedy" mode the distance is the straight line one, in "pathfinding" mode it is read from a distance field
+    that goes around the obstacles, so that the cop does not get stuck behind them
+    its coordinates are pixels, not always whole ones since it moves police_turbo cells at a time
     """
 
-    def __init__(self):
-        super().__init__
+    __slots__ = ("mode", "best_ratio", "field", "x_snake", "y_snake")
+
+    def __init__(self, mode="greedy", best_ratio=police_best_move, field=None):
+        super().__init__(x_coord=None, y_coord=None, x_shift=0, y_shift=0, length=1, surface=body_buffer(capacity=4, sparse=True), accelerator=[])
+        self.reset(mode=mode, best_ratio=best_ratio, field=field)
+
+    def reset(self, mode="greedy", best_ratio=police_best_move, field=None):
+        # the cop as newly created, its buffers being kept
+        self.mode = mode
+        self.best_ratio = best_ratio
+        self.field = field
         self.x_coord = None
         self.y_coord = None
         self.x_shift = 0
         self.y_shift = 0
         self.x_snake = 0
-        self.y_snake = 0     
+        self.y_snake = 0
         self.color = dark_blue
-        self.surface = []
         self.length = 1
+        self.surface.clear()
 
-    def set_coordinates(self):
+    def set_coordinates(self, spawns, rng):
         """
         we set initial coordinates for the police object here
-        and we ensure that the set of coordinates generated is legal, ie it does not touch any obstacle
+        and we ensure that the set of coordinates generated is legal, ie it does not touch any obstacle nor the snake
         """
 
-        self.x_coord = round(random.randrange(0, dis_width - snake_block) / 10.0) * 10.0
-        self.y_coord = round(random.randrange(0, dis_height - snake_block) / 10.0) * 10.0
-        if [self.x_coord + snake_block, self.y_coord] in borders: self.set_coordinates()
-        if [self.x_coord - snake_block, self.y_coord] in borders: self.set_coordinates()
-        if [self.x_coord, self.y_coord + snake_block] in borders: self.set_coordinates()
-        if [self.x_coord, self.y_coord - snake_block] in borders: self.set_coordinates()
+        self.x_coord, self.y_coord = spawns.sample(rng)
+
+    def snapshot(self):
+        return self.x_coord, self.y_coord, self.x_shift, self.y_shift, self.x_snake, self.y_snake, self.color, self.surface.snapshot()
+
+    def restore(self, state):
+        self.x_coord, self.y_coord, self.x_shift, self.y_shift, self.x_snake, self.y_snake, self.color, surface = state
+        self.surface.restore(surface)
 
     def position_update(self):
         super().position_update()
 
     def hyp_distance_from_snake(self, hyp_coord):
-        return np.sqrt((hyp_coord[0] - self.x_snake)**2 + (hyp_coord[1] - self.y_snake)**2)
+        # squared distance, which is enough to compare moves and spares a square root
+        return (hyp_coord[0] - self.x_snake)**2 + (hyp_coord[1] - self.y_snake)**2
 
-    def best_move(self):
+    def best_move(self, borders):
         """
         this function will compute each of the four theoretical moves (up, down, left or right)
         and calculate what would the new distance to the snake be
         as the goal of the cop is to capture the snake, we search for the move that minimizes that distance
         """
 
+        if self.mode == "pathfinding" and self.pathfinding_move(borders): return
+
         coord_if_move_up = [self.x_coord, self.y_coord - snake_block]
         coord_if_move_down = [self.x_coord, self.y_coord + snake_block]
         coord_if_move_left = [self.x_coord - snake_block, self.y_coord]
@@ -318,64 +1317,81 @@ class police(snake):
         if min_distance == dis_if_move_left: self.move_left()
         if min_distance == dis_if_move_right: self.move_right()
 
-    def random_move(self):
+    def pathfinding_move(self, borders):
+        """
+        reads the distance field at the cell each legal move would lead to and takes the closest to the snake
+        when the cop is already closer to the snake than the field is old, or when no move leads to a known distance,
+        we let the greedy move decide, returns whether a move was made
+        """
+
+        distance = self.field.lookup(self.x_coord, self.y_coord)
+        if distance is None or distance <= self.field.age: return False
+
+        boost = police_turbo * snake_block
+        best_distance = None
+        for x_shift, y_shift, move in ((0, -boost, self.move_up), (0, boost, self.move_down), (-boost, 0, self.move_left), (boost, 0, self.move_right)):
+            if borders.any_blocked(self.x_coord + x_shift, self.y_coord + y_shift, corners_probe): continue
+
+            distance = self.field.lookup(self.x_coord + x_shift, self.y_coord + y_shift)
+            if distance is not None and (best_distance is None or distance < best_distance):
+                best_distance = distance
+                best_move = move
+
+        if best_distance is None: return False
+
+        best_move()
+        return True
+
+    def random_move(self, rng):
         """
         we want our cop not to be perfect in finding us, otherwise we think it would be too hard for the snake to escape
         so we account for a probability of a random cop move
         """
 
-        choice = np.random.choice(["up", "down", "right", "left", "nothing"], 1, [0.05, 0.05, 0.05, 0.05, 0.8])[0]
+        choice = police_sampler.draw(rng)
         if choice == "up": self.move_up()
         elif choice == "down": self.move_down()
         elif choice == "right": self.move_right()
         elif choice == "left": self.move_left()
 
-    def builder(self, x_snake, y_snake):
+    def builder(self, x_snake, y_snake, borders, rng):
         self.x_snake = x_snake
         self.y_snake = y_snake
 
-        self.direction_algorithm()
+        self.direction_algorithm(borders, rng)
         super().builder()
 
-    def direction_algorithm(self):
+    def direction_algorithm(self, borders, rng):
         """
         at each frame we let the cop decide on where to move, assuming he is not brilliant every time
-        we also account for the legality of the move, by canceling the shifts and re-running the function if the move
-        was deemed to breach an obstacle
+        we also account for the legality of the move, by canceling the shifts and drawing a new move if the move
+        was deemed to breach an obstacle, a bounded number of times so that a cop in a dead end simply waits
         once the theoretical move is accepted, the police position is updated for the user to see
         """
 
-        best_move = np.random.choice([False, True], 1, [0.2, 0.8])[0]
+        for attempt in range(police_max_attempts):
+            if rng.random() < self.best_ratio: self.best_move(borders)
+            else: self.random_move(rng)
 
-        if best_move: self.best_move()
-        else: self.random_move()
+            if not self.is_close_to_obstacles(borders):
+                self.position_update()
+                return
 
-        if self.is_close_to_obstacles():
             self.x_shift = 0
             self.y_shift = 0
-            self.position_update()
-            self.direction_algorithm()
-
-        else: self.position_update()
 
     def blinking(self):
         if self.color == dark_blue: self.color = dark_red
         else: self.color = dark_blue
 
-        return datetime.now()
+    def is_breaching(self, world_width, world_height):
+        super().is_breaching(world_width, world_height)
 
-    def is_breaching(self):
-        super().is_breaching()
-
-    def is_close_to_obstacles(self):
+    def is_close_to_obstacles(self, borders):
         temp_x = self.x_coord + self.x_shift
         temp_y = self.y_coord + self.y_shift
         
-        if [temp_x, temp_y] in borders: return True
-        if [temp_x + snake_block, temp_y + snake_block] in borders: return True
-        if [temp_x - snake_block, temp_y + snake_block] in borders: return True
-        if [temp_x + snake_block, temp_y - snake_block] in borders: return True
-        if [temp_x - snake_block, temp_y - snake_block] in borders: return True
+        if borders.any_blocked(temp_x, temp_y, corners_probe): return True
 
     def move_down(self):
         super().move_down(boost=police_turbo)
@@ -389,6 +1405,15 @@ class police(snake):
     def move_right(self):
         super().move_right(boost=police_turbo)
 
+    def positions(self):
+        return [self.surface.last()] if len(self.surface) > 0 else []
+
+    def store_positions(self, out):
+        # writes the positions into the rows of out (no list being built), returns how many there are
+        if len(self.surface) == 0: return 0
+        out[0] = self.surface.squares[self.surface.end - 1]
+        return 1
+
     def is_hitting_snake(self, snake_surface):
         """
         the capture detection algorithm forces us to use a circle hitbox for each of the snake squares, for simplicity
@@ -396,185 +1421,1149 @@ class police(snake):
         we calculate the distance from each corner of the cop to each center of the snake surface's squares
         if one of those results is below the radius, it means that the cop is partially inside the snake's hitbox
         and therefore the cop captured us
+        the distances are squared, and since the corners are at x +/- snake_block and y +/- snake_block, the closest
+        corner to a square is the one minimizing each axis separately
+        a square can only be captured when its position is within snake_block + the hitbox radius of the cop on both
+        axes, which leaves five cells per axis, so only the cells of that window close enough to a corner are looked up
+        in the occupancy counter of the body: the check neither depends on the length of the snake nor builds any array
+        and a window holding no square at all (most ticks) is ruled out by a single look at the counter
         """
 
         snake_hitbox_radius = 0.8 * inside_circle_radius + 0.2 * outside_circle_radius
-        for blocks in snake_surface:
-            if np.sqrt(((self.x_coord - snake_block) - blocks[0])**2 + ((self.y_coord - snake_block) - blocks[1])**2) < snake_hitbox_radius: return True
-            if np.sqrt(((self.x_coord + snake_block) - blocks[0])**2 + ((self.y_coord - snake_block) - blocks[1])**2) < snake_hitbox_radius: return True
-            if np.sqrt(((self.x_coord - snake_block) - blocks[0])**2 + ((self.y_coord + snake_block) - blocks[1])**2) < snake_hitbox_radius: return True
-            if np.sqrt(((self.x_coord + snake_block) - blocks[0])**2 + ((self.y_coord + snake_block) - blocks[1])**2) < snake_hitbox_radius: return True
+        x_first = math.ceil((self.x_coord - snake_block - snake_hitbox_radius) / snake_block)
+        y_first = math.ceil((self.y_coord - snake_block - snake_hitbox_radius) / snake_block)
+        if not snake_surface.any_within(x_first, y_first, 5): return False
+
+        for x_cell in range(x_first, x_first + 5):
+            x_block = x_cell * snake_block
+            x_gap = min(((self.x_coord - snake_block) - x_block)**2, ((self.x_coord + snake_block) - x_block)**2)
+            if x_gap >= snake_hitbox_radius**2: continue
+
+            for y_cell in range(y_first, y_first + 5):
+                y_block = y_cell * snake_block
+                y_gap = min(((self.y_coord - snake_block) - y_block)**2, ((self.y_coord + snake_block) - y_block)**2)
+                if x_gap + y_gap < snake_hitbox_radius**2 and snake_surface.count(x_block, y_block) > 0: return True
 
-def game_loop(difficulty, police_chase=False):
+        return False
+
+class police_swarm():
     """
-    main game function, will run the game based on the selected difficulty and user action
-    handles the direction of the snake based on what key is pressed (if any is) as well as the snake actions/constraints
-    comments are written along the way when judged necessary, so as to clearly grasp how the code is structured
+    class responsible for a swarm of cops chasing the snake, all of them updated together in numpy arrays
+    every cop follows the rules of a single police object: at each frame it takes its best move with the probability
+    best_ratio and a random move otherwise ("nothing" keeping the shift of its last move), the cops whose move would
+    breach an obstacle having their shift canceled and drawing a new one (a bounded number of times) while the others move
+    in "pathfinding" mode the cops share the distance field of the game, and the capture is checked on the cells of the
+    snake's body around each cop (the occupancy counter of its body_buffer), so that its cost does not depend on the
+    length of the snake
     """
 
-    # initializes some game management parameters
-    game_over = game_close = key_pressed = False
-    last_blink = datetime.now()
+    moves = np.array([(0, -1), (0, 1), (-1, 0), (1, 0), (0, 0)]) # up, down, left, right and standing still
+
+    def __init__(self, count, mode="greedy", best_ratio=police_best_move, field=None, rng=None):
+        # pixels probed for the legality of every move: the corners probe around the position after the move
+        self.probes = (self.moves[:, None, :] * police_turbo * snake_block + np.array(corners_probe)[None, :, :]).reshape(-1, 2)
+        self.count = count
+        self.mode = mode
+        self.best_ratio = best_ratio
+        self.field = field
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.x_coords = np.zeros(count)
+        self.y_coords = np.zeros(count)
+        self.x_shifts = np.zeros(count)
+        self.y_shifts = np.zeros(count)
+        self.x_snake = 0
+        self.y_snake = 0
+        self.color = dark_blue
+        weights = [police_random_weights[police_random_moves.index(move)] for move in ["up", "down", "left", "right", "nothing"]]
+        self.cumulative_weights = np.cumsum(weights) / sum(weights)
 
-    # initializes the game
-    snake_speed = speed[difficulty]
-    dis.fill(black)
+    def set_coordinates(self, spawns, rng):
+        """
+        the cops are placed on distinct free cells (the cells are taken in the index while drawing, then given back)
+        """
 
-    # initializes the snake position
-    x_coord = dis_width / 2
-    y_coord = dis_height / 2
+        cells = []
+        for cop in range(self.count):
+            cell = spawns.sample(rng)
+            if cell is None: break
+            spawns.occupy(*cell)
+            cells.append(cell)
+        for cell in cells: spawns.release(*cell)
+
+        for cop in range(self.count): self.x_coords[cop], self.y_coords[cop] = cells[cop % len(cells)]
+        self.x_shifts[:] = 0
+        self.y_shifts[:] = 0
+
+    def positions(self):
+        return np.column_stack((np.rint(self.x_coords), np.rint(self.y_coords))).astype(int).tolist()
+
+    def store_positions(self, out):
+        np.rint(self.x_coords, out=out[:, 0])
+        np.rint(self.y_coords, out=out[:, 1])
+        return self.count
+
+    def headings(self):
+        # the move of the shift of every cop (standing still for the cops without one)
+        return np.select([self.y_shifts < 0, self.y_shifts > 0, self.x_shifts < 0, self.x_shifts > 0], [0, 1, 2, 3], len(self.moves) - 1)
+
+    def legal_moves(self, borders):
+        # whether each of the five moves of every cop keeps it away from the obstacles (the corners probe of is_close_to_obstacles)
+        blocked = borders.blocked(self.x_coords[None, :] + self.probes[:, :1], self.y_coords[None, :] + self.probes[:, 1:])
+        return ~blocked.reshape(len(self.moves), len(corners_probe), self.count).any(axis=1).T
+
+    def best_moves(self, legal):
+        # the move of one block that brings each cop closest to the snake, the last one in up, down, left, right order
+        # being taken among equally close moves, like best_move does
+        x_gaps = self.x_coords[:, None] + self.moves[:4, 0] * snake_block - self.x_snake
+        y_gaps = self.y_coords[:, None] + self.moves[:4, 1] * snake_block - self.y_snake
+        best = 3 - np.argmin((x_gaps**2 + y_gaps**2)[:, ::-1], axis=1)
+
+        if self.mode == "pathfinding" and self.field is not None:
+            field_best = self.pathfinding_moves(legal)
+            best = np.where(field_best >= 0, field_best, best)
+
+        return best
+
+    def pathfinding_moves(self, legal):
+        # the legal move leading to the cell the closest to the snake in the distance field, -1 where the greedy move decides
+        distance = self.field.lookup_array(self.x_coords, self.y_coords)
+        best = np.full(self.count, -1)
+        best_distance = np.full(self.count, np.iinfo(np.int64).max)
+
+        for move, (x_shift, y_shift) in enumerate(self.moves[:4] * police_turbo * snake_block):
+            move_distance = self.field.lookup_array(self.x_coords + x_shift, self.y_coords + y_shift)
+            closer = legal[:, move] & (move_distance >= 0) & (move_distance < best_distance)
+            best[closer] = move
+            best_distance[closer] = move_distance[closer]
+
+        best[(distance < 0) | (distance <= self.field.age)] = -1
+        return best
+
+    def builder(self, x_snake, y_snake, borders, rng=None):
+        """
+        every cop draws its move, the cops whose move is legal take it and the other ones draw again
+        since the cops waiting for a legal move stay in place, the legality of every move and the best moves are
+        computed once, so that drawing again only costs the random draws
+        the draws come from the swarm's own numpy generator, rng being only taken to answer like police.builder
+        """
 
-    # initializes our snake object
-    our_snake = snake(x_coord=x_coord, y_coord=y_coord, x_shift=0, y_shift=0, length=1, surface=[], accelerator=[])
+        self.x_snake = x_snake
+        self.y_snake = y_snake
 
-    # builds our obstacles pattern at inception
-    our_obstacles = pattern(difficulty=difficulty, dis_width=dis_width, dis_height=dis_height, snake_block=snake_block)
-    our_obstacles.build_pattern()
+        legal = self.legal_moves(borders)
+        best = self.best_moves(legal)
+        current = self.headings()
+        chosen = np.full(self.count, len(self.moves) - 1)
+
+        pending = np.arange(self.count)
+        for attempt in range(police_max_attempts):
+            if len(pending) == 0: break
+
+            # "nothing" keeps the current shift of the cop, which is canceled once a move of the cop was blocked
+            random_draws = np.minimum(np.searchsorted(self.cumulative_weights, self.rng.random(len(pending)), side="right"), len(self.moves) - 1)
+            random_draws = np.where(random_draws == len(self.moves) - 1, current[pending], random_draws)
+            draws = np.where(self.rng.random(len(pending)) < self.best_ratio, best[pending], random_draws)
+            accepted = legal[pending, draws]
+            chosen[pending[accepted]] = draws[accepted]
+            pending = pending[~accepted]
+            current[pending] = len(self.moves) - 1
+
+        self.x_shifts[:] = self.moves[chosen, 0] * police_turbo * snake_block
+        self.y_shifts[:] = self.moves[chosen, 1] * police_turbo * snake_block
+        self.x_coords += self.x_shifts
+        self.y_coords += self.y_shifts
 
-    # initializes our police object
-    if police_chase: our_police = police()
+    def blinking(self):
+        if self.color == dark_blue: self.color = dark_red
+        else: self.color = dark_blue
 
-    # we print the pattern at last and save it (so as to copy paste it at each future frame)
-    for coord in borders: our_obstacles.print_pattern(coord[0], coord[1])
-    saved_surface = pygame.Surface((dis_width, dis_height))
-    saved_surface.blit(dis, (0, 0))
+    def snapshot(self):
+        return self.x_coords.copy(), self.y_coords.copy(), self.x_shifts.copy(), self.y_shifts.copy(), self.x_snake, self.y_snake, self.color, self.rng.bit_generator.state
 
-    # initializes our food object and generates the first one
-    our_food = food(snake_speed=snake_speed)
-    our_food.generate()
+    def restore(self, state):
+        x_coords, y_coords, x_shifts, y_shifts, self.x_snake, self.y_snake, self.color, self.rng.bit_generator.state = state
+        self.x_coords[:] = x_coords
+        self.y_coords[:] = y_coords
+        self.x_shifts[:] = x_shifts
+        self.y_shifts[:] = y_shifts
 
-    # places out our police object
-    if police_chase: our_police.set_coordinates()
+    def is_breaching(self, world_width, world_height):
+        self.x_coords[self.x_coords >= world_width] = 0
+        self.x_coords[self.x_coords < 0] = world_width
+        self.y_coords[self.y_coords >= world_height] = 0
+        self.y_coords[self.y_coords < 0] = world_height
 
-    # while the game is not lost this loop is entered
-    while not game_over:
+    def is_hitting_snake(self, snake_surface):
+        """
+        same hitbox as police.is_hitting_snake, but only the cells around each cop are tested: a square can only be
+        captured when its position is within snake_block + the hitbox radius of the cop on both axes, which leaves five
+        cells per axis, and the distances are only computed for the cells the snake's body occupies
+        """
 
-        # if the game is lost we check if we want to close it or not
-        while game_close == True: 
-            close_game(our_snake.length)
-            for event in pygame.event.get():
-                if event.type == anykey:
-                    if event.key == q:
-                        game_over = True
-                        game_close = False
-                    if event.key == c: main_menu()
+        snake_hitbox_radius = 0.8 * inside_circle_radius + 0.2 * outside_circle_radius
+        offsets = np.arange(5)
+        x_cells = np.ceil((self.x_coords - snake_block - snake_hitbox_radius) / snake_block).astype(np.intp)[:, None] + offsets
+        y_cells = np.ceil((self.y_coords - snake_block - snake_hitbox_radius) / snake_block).astype(np.intp)[:, None] + offsets
+
+        # cells of those windows holding squares of the snake
+        x_indexes = np.clip(x_cells + snake_surface.padding, 0, snake_surface.occupancy.shape[0] - 1)
+        y_indexes = np.clip(y_cells + snake_surface.padding, 0, snake_surface.occupancy.shape[1] - 1)
+        occupied = snake_surface.occupancy[x_indexes[:, :, None], y_indexes[:, None, :]] > 0
+        occupied &= (x_indexes == x_cells + snake_surface.padding)[:, :, None] & (y_indexes == y_cells + snake_surface.padding)[:, None, :]
+        cops, x_offsets, y_offsets = np.nonzero(occupied)
+        if len(cops) == 0: return False
+
+        x_blocks = x_cells[cops, x_offsets] * snake_block
+        y_blocks = y_cells[cops, y_offsets] * snake_block
+        x_coords = self.x_coords[cops]
+        y_coords = self.y_coords[cops]
+        x_gaps = np.minimum(((x_coords - snake_block) - x_blocks)**2, ((x_coords + snake_block) - x_blocks)**2)
+        y_gaps = np.minimum(((y_coords - snake_block) - y_blocks)**2, ((y_coords + snake_block) - y_blocks)**2)
+        return bool((x_gaps + y_gaps < snake_hitbox_radius**2).any())
+
+class game_snapshot():
+    """
+    class holding the dynamic state of a game at one tick, as taken by game_state.clone and put back by game_state.restore
+    every part is a tuple of values, copies and shared lists that nothing modifies afterwards (the spawn indexes being
+    entries of their journals, which are never modified either), so a snapshot can be restored many times
+    """
 
-        # we move our snake following the user input (if any)
-        for event in pygame.event.get():
-            if event.type == stop: game_over = True
+    def __init__(self, game, snake, food, food_spawns, police, police_spawns, field):
+        self.game = game
+        self.snake = snake
+        self.food = food
+        self.food_spawns = food_spawns
+        self.police = police
+        self.police_spawns = police_spawns
+        self.field = field
 
-            if event.type == anykey:
-                key_pressed = True
+class game_state():
+    """
+    class responsible for the simulation of one game, independently from the display
+    it owns the snake, the food, the obstacles and the police (if the mode is selected) and advances them by one tick
+    the obstacles are on a grid of the game's own (self.borders, along with the size of its world), so that several
+    games can be alive at once
+    at every call to step, following the exact same rules as the rendered game, which simply drives it
+    nothing here touches pygame, so that games can be run headless as fast as the machine allows (tests, bots, tuning)
+    everything random derives from the seed (the level from its own stream, the rest of the game from the game's own
+    self.rng) and time is counted in ticks, so that the same seed and the same actions at the same ticks always replay
+    the same game, whatever other games are played in between
+    when world_chunks (columns, rows) is given, the game takes place in a large world of that many screens whose obstacles
+    are generated chunk by chunk (see chunked_grid); the cops then need no knowledge of the whole board, so only the
+    single greedy cop is available there
+    """
 
-                if event.key == left: our_snake.move_left()
-                elif event.key == right: our_snake.move_right()
-                elif event.key == up: our_snake.move_up()
-                elif event.key == down: our_snake.move_down()
+    def __init__(self, difficulty, police_chase=False, police_mode="greedy", best_ratio=police_best_move, seed=None, n_police=1, world_chunks=None):
+        if world_chunks is not None and police_chase and (n_police > 1 or police_mode != "greedy"):
+            raise ValueError("the police swarm and the pathfinding cop need the whole board, they are not available in large worlds")
 
-        # we update the position of our snake and copy the obstacles background
-        our_snake.position_update()
-        dis.blit(saved_surface, (0, 0))
+        self.difficulty = difficulty
+        self.police_chase = police_chase
+        self.police_mode = police_mode
+        self.n_police = n_police
+        self.world = world_chunks
+        self.key_pressed = False
+        self.game_close = False
+        self.cause = None # what ended the game: "police", "obstacle" or "tail"
+        self.ticks = 0
+        self.snapshots = weakref.WeakSet() # snapshots alive, the spawn indexes journaling their changes while there are some
+        self.journaling = False
+
+        # seeds the level and the game streams
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        seeds = random.Random(self.seed)
+        level_rng = random.Random(seeds.getrandbits(64))
+        self.rng = random.Random(seeds.getrandbits(64))
+
+        # initializes our snake object in the middle of the screen (on the body of a game over if there is one)
+        if world_chunks is None: surface = body_pool.pop() if body_pool else body_buffer()
+        else: surface = body_buffer(sparse=True)
+        self.snake = snake(x_coord=dis_width // 2, y_coord=dis_height // 2, x_shift=0, y_shift=0, length=1, surface=surface, accelerator=[])
+
+        # builds our obstacles pattern at inception (or copies the level cached for the seed), or the chunks of the world on demand
+        # on the single screen board the grid of a game over is overwritten rather than a new one allocated
+        self.level = None
+        if world_chunks is None:
+            self.borders = grid_pool.pop() if grid_pool else obstacle_grid(dis_width, dis_height)
+            self.obstacles = pattern(difficulty=difficulty, dis_width=dis_width, dis_height=dis_height, snake_block=snake_block, borders=self.borders, rng=level_rng)
+            if cached_levels is not None:
+                self.level = cached_levels.load(difficulty, self.seed)
+                self.level.copy_to(self.borders)
+            else:
+                self.borders.clear()
+                self.obstacles.build_pattern()
+        else:
+            self.borders = chunked_grid(difficulty, *world_chunks, seed=level_rng.getrandbits(64))
+            self.obstacles = self.borders
+        self.world_width, self.world_height = self.borders.width, self.borders.height
+
+        # indexes the cells where the food and the cop can appear, kept up to date with the snake's moves
+        if world_chunks is None: self.food_spawns = self.spawns(food_probe)
+        else: self.food_spawns = world_spawns(self.borders, food_probe, self.snake)
+        self.food_spawns.occupy(self.snake.x_coord, self.snake.y_coord)
+        self.snake.surface.listeners.append(self.food_spawns)
+
+        # initializes our food object and generates the first one
+        self.food = food_pool.pop() if food_pool else food(snake_speed=speed[difficulty])
+        self.food.reset(snake_speed=speed[difficulty])
+        self.food.generate(self.food_spawns, self.rng)
+
+        # initializes and places out our police object, or our swarm of cops (with their distance field if they follow the shortest paths)
+        self.police = None
+        self.police_spawns = None
+        self.police_previous = np.zeros((n_police, 2)) # positions of the cops before the last tick (police_previous_count of them)
+        self.police_previous_count = 0
+        self.field = None
+        if police_chase:
+            if police_mode == "pathfinding": self.field = distance_field(self.borders)
+            if n_police > 1: self.police = police_swarm(n_police, mode=police_mode, best_ratio=best_ratio, field=self.field, rng=np.random.default_rng(seeds.getrandbits(64)))
+            elif police_pool:
+                self.police = police_pool.pop()
+                self.police.reset(mode=police_mode, best_ratio=best_ratio, field=self.field)
+            else: self.police = police(mode=police_mode, best_ratio=best_ratio, field=self.field)
+            if world_chunks is None: self.police_spawns = self.spawns(cross_probe)
+            else: self.police_spawns = world_spawns(self.borders, cross_probe, self.snake, clearance=police_spawn_clearance)
+            self.police_spawns.occupy(self.snake.x_coord, self.snake.y_coord)
+            self.snake.surface.listeners.append(self.police_spawns)
+
+            # the cells within capture range of the head are kept out of the draw while the cops are placed
+            cleared = []
+            if world_chunks is None: cleared = self.police_spawns.clear_around(self.snake.x_coord, self.snake.y_coord, police_spawn_clearance)
+            self.police.set_coordinates(self.police_spawns, self.rng)
+            for cell in cleared: self.police_spawns.release(*cell)
+
+    def spawns(self, probe):
+        # an index of the cells where something can appear on the obstacles of the game, the one of a game over if there is one
+        if spawn_pool:
+            our_spawns = spawn_pool.pop()
+            our_spawns.reset(self.borders, probe)
+            return our_spawns
+        return spawn_index(self.borders, probe)
+
+    def score(self):
+        return self.snake.length - 1
+
+    def journal(self, journaling):
+        # starts journaling the changes of the bodies and of the spawn indexes from new first entries, or stops it
+        # (a first entry holding an object of its own, so that it is never mistaken for the one of another journal)
+        self.journaling = journaling
+        journaled = [self.snake.surface, self.food_spawns, self.police_spawns]
+        if isinstance(self.police, police): journaled.append(self.police.surface)
+        for our_journaled in journaled:
+            if isinstance(our_journaled, (body_buffer, spawn_index)): our_journaled.journal = (None, 0, None, object()) if journaling else None
+
+    def clone(self):
+        """
+        takes a snapshot of the game, to be restored as many times as needed and in any order (lookahead agents, rollouts)
+        only the small dynamic state is copied: the obstacles, the passable cells of the distance field and the legal
+        spawn cells are shared with the game, a search of the distance field in progress is only copied if the game goes
+        on with it, and the occupancy counters of the bodies and the spawn indexes are journaled while snapshots are alive,
+        a snapshot holding the current entries of their journals rather than copies of arrays the size of the board
+        """
 
-        # we display the food
-        pygame.draw.rect(dis, foodDicts[our_food.foodtype], [our_food.x_coord, our_food.y_coord, snake_block, snake_block])
+        if not self.snapshots: self.journal(True)
+        our_snake, our_food = self.snake, self.food
+        our_snapshot = game_snapshot(
+            game=(self.ticks, self.key_pressed, self.game_close, self.cause, self.police_previous.copy(), self.police_previous_count, self.rng.getstate()),
+            snake=(our_snake.x_coord, our_snake.y_coord, our_snake.x_shift, our_snake.y_shift, our_snake.length, tuple(our_snake.accelerator), our_snake.surface.snapshot()),
+            food=(our_food.x_coord, our_food.y_coord, our_food.foodtype, our_food.snake_speed),
+            food_spawns=self.food_spawns.snapshot() if isinstance(self.food_spawns, spawn_index) else None,
+            police=self.police.snapshot() if self.police is not None else None,
+            police_spawns=self.police_spawns.snapshot() if self.police is not None and isinstance(self.police_spawns, spawn_index) else None,
+            field=self.field.snapshot() if self.field is not None else None)
+        self.snapshots.add(our_snapshot)
+        return our_snapshot
+
+    def restore(self, our_snapshot):
+        """
+        puts the game back in the state of a snapshot taken from it, the snapshot being left as it was
+        (a renderer drawing the game no longer matches it and should be created again)
+        """
+
+        self.ticks, self.key_pressed, self.game_close, self.cause, police_previous, self.police_previous_count, rng_state = our_snapshot.game
+        self.police_previous[:] = police_previous
+        self.rng.setstate(rng_state)
+
+        our_snake = self.snake
+        our_snake.x_coord, our_snake.y_coord, our_snake.x_shift, our_snake.y_shift, our_snake.length, accelerator, surface = our_snapshot.snake
+        our_snake.accelerator[:] = accelerator
+        our_snake.surface.restore(surface)
+
+        self.food.x_coord, self.food.y_coord, self.food.foodtype, self.food.snake_speed = our_snapshot.food
+
+        if our_snapshot.food_spawns is not None: self.food_spawns.restore(our_snapshot.food_spawns)
+        if our_snapshot.police is not None: self.police.restore(our_snapshot.police)
+        if our_snapshot.police_spawns is not None: self.police_spawns.restore(our_snapshot.police_spawns)
+        if our_snapshot.field is not None: self.field.restore(our_snapshot.field)
+
+    def close(self):
+        """
+        gives the cop and the food of the game back to their pools for the next games, once the game is over for good
+        on the single screen board the obstacle grid, the body of the snake and the spawn indexes go to pools as well, the
+        body being emptied here and the grid and the indexes being overwritten by the game taking them
+        """
+
+        if isinstance(self.police, police) and len(police_pool) < pool_size: police_pool.append(self.police)
+        if len(food_pool) < pool_size: food_pool.append(self.food)
+        if self.world is None:
+            if len(grid_pool) < pool_size: grid_pool.append(self.borders)
+            surface = self.snake.surface
+            surface.clear()
+            surface.listeners.clear()
+            if len(body_pool) < pool_size: body_pool.append(surface)
+            for our_spawns in (self.food_spawns, self.police_spawns):
+                if our_spawns is not None and len(spawn_pool) < 2 * pool_size: spawn_pool.append(our_spawns)
+        self.police = self.food = self.borders = self.food_spawns = self.police_spawns = self.snake.surface = None
+
+    def lose(self, cause):
+        # the first rule broken during the tick is the one the game is lost to
+        if not self.game_close: self.cause = cause
+        self.game_close = True
+
+    def step(self, action=None):
+        """
+        advances the game by one tick, the action being one of "up", "down", "left", "right" or None (keep going)
+        returns True once the game is lost
+        """
+
+        if action is not None: self.key_pressed = True
+        if self.journaling and not self.snapshots: self.journal(False)
+
+        if action == "left": self.snake.move_left()
+        elif action == "right": self.snake.move_right()
+        elif action == "up": self.snake.move_up()
+        elif action == "down": self.snake.move_down()
+
+        # the previous positions of the cops are kept so that frames can be interpolated between two ticks
+        if self.police is not None: self.police_previous_count = self.police.store_positions(self.police_previous)
+
+        # we update the position of our snake
+        self.snake.position_update()
 
         # fast multiplier handler (if a speed multiplier food has been eaten)
-        if len(our_snake.accelerator) > 0: our_food.handle_accelerators(our_snake.accelerator)
+        if len(self.snake.accelerator) > 0: self.food.handle_accelerators(self.snake.accelerator, self.ticks)
 
         # builds the snake from the user input (as well as the cop if the game mode is selected)
-        our_snake.builder()
-        if police_chase and key_pressed: our_police.builder(x_snake=our_snake.x_coord, y_snake=our_snake.y_coord)
+        self.snake.builder()
+        if profiler is not None: profiler.mark("movement")
+        if self.field is not None: self.field.update(self.snake.x_coord, self.snake.y_coord)
+        if self.police is not None and self.key_pressed: self.police.builder(x_snake=self.snake.x_coord, y_snake=self.snake.y_coord, borders=self.borders, rng=self.rng)
+        if profiler is not None: profiler.mark("police")
 
         # checks if the cop captured the snake
-        if police_chase and our_police.is_hitting_snake(snake_surface=our_snake.surface): game_close = True
+        if self.police is not None and self.police.is_hitting_snake(snake_surface=self.snake.surface): self.lose("police")
 
         # handling the ability to go the opposite side when hitting the wall
-        our_snake.is_breaching()
-        if police_chase: our_police.is_breaching()
+        self.snake.is_breaching(self.world_width, self.world_height)
+        if self.police is not None: self.police.is_breaching(self.world_width, self.world_height)
 
         # handles illegal wall touches
-        if our_snake.is_hitting_obstacle(): game_close = True
+        if self.snake.is_hitting_obstacle(self.borders): self.lose("obstacle")
 
         # handles touching its tail
-        if our_snake.is_hitting_himself(): game_close = True
+        if self.snake.is_hitting_himself(): self.lose("tail")
+        if profiler is not None: profiler.mark("collisions")
+
+        # eaten food handler
+        if self.snake.x_coord == self.food.x_coord and self.snake.y_coord == self.food.y_coord:
+            # a speed boost lasts secondsMultiplier seconds at the boosted speed, counted in ticks
+            if self.food.foodtype == 'fast': self.food.snake_speed *= fasterMultiplier
+            self.snake.ate_food(self.food.foodtype, boost_end=self.ticks + round(secondsMultiplier * self.food.snake_speed))
+
+            # if the food is eaten, we generate a new one (the same object, moved)
+            self.food.generate(self.food_spawns, self.rng)
+
+        if profiler is not None: profiler.mark("food")
+        self.ticks += 1
+        return self.game_close
+
+class random_policy():
+    """
+    default headless driver: keeps its direction and turns at random from time to time
+    it has its own random stream, so that its draws do not change the ones of the game
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, our_game):
+        if our_game.ticks == 0 or self.rng.random() < 0.1: return self.rng.choice(["up", "down", "left", "right"])
+        return None
+
+class cautious_policy(random_policy):
+    """
+    headless driver that avoids the moves leading straight into an obstacle or into its own body, and never turns back
+    it keeps its direction while it is safe and turns towards a random safe direction otherwise (or from time to time)
+    """
+
+    moves = {"up": (0, -snake_block), "down": (0, snake_block), "left": (-snake_block, 0), "right": (snake_block, 0)}
+
+    def is_safe(self, our_game, move):
+        x_shift, y_shift = self.moves[move]
+        our_snake = our_game.snake
+        if (x_shift, y_shift) == (-our_snake.x_shift, -our_snake.y_shift): return False
+
+        x_coord = (our_snake.x_coord + x_shift) % our_game.world_width
+        y_coord = (our_snake.y_coord + y_shift) % our_game.world_height
+        return not our_game.borders.any_blocked(x_coord, y_coord, cross_probe) and our_snake.surface.count(x_coord, y_coord) == 0
+
+    def __call__(self, our_game):
+        our_snake = our_game.snake
+        current = next((move for move, shift in self.moves.items() if shift == (our_snake.x_shift, our_snake.y_shift)), None)
+        if current is not None and self.rng.random() >= 0.05 and self.is_safe(our_game, current): return None
+
+        safe = [move for move in self.moves if self.is_safe(our_game, move)]
+        return self.rng.choice(safe) if safe else None
+
+class seeking_policy(cautious_policy):
+    """
+    headless driver heading for the food: among the safe moves it takes one that brings its head closest to the food
+    (through the sides of the world when that is shorter), keeping its direction when it is one of them
+    when its head has not got closer to the food for `patience` ticks (an obstacle standing in the way), it drives like
+    the cautious policy for as many ticks to find another way before heading for the food again
+    """
+
+    patience = 50
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.food = None # position of the food the closest distance was measured to
+        self.closest = None
+        self.stalled = 0 # ticks since the head last got closer to the food
+        self.wandering = 0 # ticks left driving like the cautious policy
+
+    def distance(self, our_game, move):
+        x_shift, y_shift = self.moves[move] if move is not None else (0, 0)
+        world_width, world_height = our_game.world_width, our_game.world_height
+        x_distance = abs((our_game.snake.x_coord + x_shift - our_game.food.x_coord) % world_width)
+        y_distance = abs((our_game.snake.y_coord + y_shift - our_game.food.y_coord) % world_height)
+        return min(x_distance, world_width - x_distance) + min(y_distance, world_height - y_distance)
+
+    def __call__(self, our_game):
+        if our_game.food.x_coord is None: return super().__call__(our_game)
+
+        distance = self.distance(our_game, None)
+        if (our_game.food.x_coord, our_game.food.y_coord) != self.food or distance < self.closest:
+            self.food, self.closest, self.stalled = (our_game.food.x_coord, our_game.food.y_coord), distance, 0
+        else: self.stalled += 1
+
+        if self.stalled >= self.patience:
+            self.closest, self.stalled, self.wandering = distance, 0, self.patience
+        if self.wandering > 0:
+            self.wandering -= 1
+            return super().__call__(our_game)
+
+        our_snake = our_game.snake
+        current = next((move for move, shift in self.moves.items() if shift == (our_snake.x_shift, our_snake.y_shift)), None)
+        safe = [move for move in self.moves if self.is_safe(our_game, move)]
+        if not safe: return None
+
+        best = min(safe, key=lambda move: (self.distance(our_game, move), move != current, self.rng.random()))
+        return None if best == current else best
+
+def run_headless(difficulty, police_chase=False, max_ticks=10000, policy=None, police_mode="greedy", seed=None, n_police=1, world_chunks=None, best_ratio=police_best_move):
+    """
+    plays one game without any display nor frame cap, the policy being called at every tick to choose the action
+    (a random_policy seeded like the game by default)
+    returns the final state of the game along with the simulation throughput
+    """
 
-        # updates the score continuously
-        scoring_update(our_snake.length - 1)
+    our_game = game_state(difficulty=difficulty, police_chase=police_chase, police_mode=police_mode, best_ratio=best_ratio, seed=seed, n_police=n_police, world_chunks=world_chunks)
+    if policy is None: policy = random_policy(our_game.seed)
 
-        # blinking police light
-        if police_chase and last_blink + timedelta(seconds=0.2) < datetime.now(): last_blink = our_police.blinking()
+    start = time.perf_counter()
+    while our_game.ticks < max_ticks and not our_game.step(policy(our_game)): pass
+    elapsed = time.perf_counter() - start
 
+    return our_game, our_game.ticks / elapsed if elapsed > 0 else float("inf")
+
+def init_display():
+    """
+    creates the window and the display objects, only needed when the game is actually rendered
+    only the modules of pygame the game uses are initialized (no sound), the font being loaded with the first text
+    """
+
+    global dis, clock
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_caption('Enhanced Snake Game')
+    dis = pygame.display.set_mode((dis_width, dis_height))
+    clock = pygame.time.Clock()
+
+def load_font(name, size):
+    """
+    finding a font by name scans every font of the system, so the path found is written to font_cache_path and the
+    font is loaded from it directly in the next runs (the default font of pygame standing in when there is no such font)
+    """
+
+    try:
+        with open(font_cache_path) as font_file: cached_name, path = font_file.read().split("\t", 1)
+        if cached_name == name and (path == "" or os.path.isfile(path)): return pygame.font.Font(path or None, size)
+    except (OSError, ValueError):
+        pass
+
+    path = pygame.font.match_font(name)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        with open(font_cache_path, "w") as font_file: font_file.write(f"{name}\t{path or ''}")
+    except OSError:
+        pass
+
+    return pygame.font.Font(path, size)
+
+@functools.lru_cache(maxsize=256)
+def render_text(msg, color):
+    # rendered texts are cached, so that the score is only rendered again when it changes
+    global font_style
+
+    if font_style is None: font_style = load_font(font_name, font_size)
+    return font_style.render(msg, True, color)
+
+def interpolate(previous, current, alpha):
+    # position between two ticks, unless the move wrapped around the screen (then we simply show the current one)
+    if previous is None or abs(current[0] - previous[0]) > 2 * snake_block or abs(current[1] - previous[1]) > 2 * snake_block: return current
+    return previous[0] + alpha * (current[0] - previous[0]), previous[1] + alpha * (current[1] - previous[1])
+
+def sprite_key(sprite):
+    rect, color = sprite
+    return rect.x, rect.y, rect.width, rect.height, color
+
+class renderer():
+    """
+    class responsible for drawing a game state on the display
+    in "full" mode every frame copies the whole background and draws the food, the snake, the cop and the score again
+    in "dirty" mode only what changed since the last frame is restored from the background and drawn again: the cells
+    the snake entered or left (the renderer listens to the snake's body like the spawn indexes), the food, the moving
+    sprites and the score area, and only those rectangles are sent to the display
+    frames can be drawn between two ticks: the snake's head and the cops are sprites interpolated between their
+    previous and current positions (alpha being the fraction of the tick elapsed), the rest of the body stays on its cells
+    the layers are kept in the same order as the full drawing (food, snake, cop, then the score and the profiler's
+    overlay on top)
+    """
+
+    def __init__(self, our_game, background, mode="dirty"):
+        self.game = our_game
+        self.background = background
+        self.mode = mode
+        self.touched_cells = set()
+        self.drawn_food = None
+        self.drawn_head = None
+        self.drawn_sprites = []
+        self.drawn_score = None
+        self.drawn_overlay = None
+        self.first_frame = True
+        our_game.snake.surface.listeners.append(self)
+
+    def occupy(self, x_coord, y_coord):
+        self.touched_cells.add((round(x_coord), round(y_coord)))
+
+    def release(self, x_coord, y_coord):
+        self.touched_cells.add((round(x_coord), round(y_coord)))
+
+    def food_state(self):
+        our_food = self.game.food
+        if our_food.x_coord is None: return None
+        return pygame.Rect(our_food.x_coord, our_food.y_coord, snake_block, snake_block), foodDicts[our_food.foodtype]
+
+    def head_cell(self):
+        return self.game.snake.surface.last()
+
+    def sprites(self, alpha):
+        # the snake's head then the cop, as (rectangle, color) pairs
+        our_sprites = []
+        body = self.game.snake.surface
+        if len(body) > 0:
+            previous = body.array()[-2].tolist() if len(body) > 1 else None
+            x_coord, y_coord = interpolate(previous, body.last(), alpha)
+            our_sprites.append((pygame.Rect(round(x_coord), round(y_coord), snake_block, snake_block), self.game.snake.color))
+
+        our_police = self.game.police
+        if our_police is not None:
+            previous = self.game.police_previous[:self.game.police_previous_count].tolist()
+            for cop, position in enumerate(our_police.positions()):
+                x_coord, y_coord = interpolate(previous[cop] if cop < len(previous) else None, position, alpha)
+                our_sprites.append((pygame.Rect(round(x_coord), round(y_coord), snake_block, snake_block), our_police.color))
+
+        return our_sprites
+
+    def score_state(self):
+        text = render_text("Your Score: " + str(self.game.score()), white)
+        return text.get_rect(topleft=(0, 0)), text
+
+    def overlay_state(self):
+        return profiler.overlay_state() if profiler is not None else None
+
+    def draw(self, alpha=1.0):
+        our_sprites = self.sprites(alpha)
+        our_overlay = self.overlay_state()
+        if self.mode == "full" or self.first_frame or len(our_sprites) > dirty_sprites_limit: self.draw_full(our_sprites, our_overlay)
+        else: self.draw_dirty(our_sprites, our_overlay)
+
+        self.first_frame = False
+        self.touched_cells.clear()
+        self.drawn_food = self.food_state()
+        self.drawn_head = self.head_cell()
+        self.drawn_sprites = our_sprites
+        self.drawn_score = self.score_state()
+        self.drawn_overlay = our_overlay
+
+    def draw_full(self, our_sprites, our_overlay=None):
+        dis.blit(self.background, (0, 0))
+
+        our_food = self.food_state()
+        if our_food is not None: pygame.draw.rect(dis, our_food[1], our_food[0])
+
+        # the body without its head, then the sprites
+        for x_coord, y_coord in self.game.snake.surface.array()[:-1].tolist():
+            pygame.draw.rect(dis, self.game.snake.color, [x_coord, y_coord, snake_block, snake_block])
+        for rect, color in our_sprites: pygame.draw.rect(dis, color, rect)
+
+        score_rect, text = self.score_state()
+        dis.blit(text, score_rect)
+        if our_overlay is not None: dis.blit(our_overlay[1], our_overlay[0])
+
+        if profiler is not None: profiler.mark("render")
         pygame.display.update()
+        if profiler is not None: profiler.mark("display")
+
+    def draw_snake_cells(self, rect, head):
+        # draws again the parts of the snake squares lying within the rectangle (but the head, which is a sprite)
+        body = self.game.snake.surface
+        for x_coord in range(rect.left // snake_block * snake_block, rect.right, snake_block):
+            for y_coord in range(rect.top // snake_block * snake_block, rect.bottom, snake_block):
+                if body.count(x_coord, y_coord) > (1 if [x_coord, y_coord] == head else 0):
+                    pygame.draw.rect(dis, self.game.snake.color, rect.clip((x_coord, y_coord, snake_block, snake_block)))
+
+    def draw_dirty(self, our_sprites, our_overlay=None):
+        our_food = self.food_state()
+        head = self.head_cell()
+        score_rect, text = self.score_state()
+
+        # rectangles whose content is wiped and restored from the background
+        erased = [pygame.Rect(x_coord, y_coord, snake_block, snake_block) for x_coord, y_coord in self.touched_cells]
+        # when the head moved, its previous cell is now a body square and its new cell (possibly left by the tail in the same tick) is a sprite
+        if self.drawn_head is not None and self.drawn_head != head:
+            erased.append(pygame.Rect(self.drawn_head[0], self.drawn_head[1], snake_block, snake_block))
+            if head is not None: erased.append(pygame.Rect(head[0], head[1], snake_block, snake_block))
+        if self.drawn_food is not None and self.drawn_food != our_food: erased.append(self.drawn_food[0])
+        # sprites are compared through hashable keys, since a swarm makes hundreds of them
+        drawn_keys = {sprite_key(sprite) for sprite in self.drawn_sprites}
+        our_keys = {sprite_key(sprite) for sprite in our_sprites}
+        moved = [sprite for sprite in our_sprites if sprite_key(sprite) not in drawn_keys]
+        moved_keys = {sprite_key(sprite) for sprite in moved}
+        erased.extend(sprite[0] for sprite in self.drawn_sprites if sprite_key(sprite) not in our_keys)
+
+        # the score is blended over what lies below it, so its whole area is redrawn when anything below it changes
+        changed = erased + [sprite[0] for sprite in moved]
+        if our_food is not None and our_food != self.drawn_food: changed.append(our_food[0])
+        redraw_overlay = our_overlay != self.drawn_overlay or (our_overlay is not None and our_overlay[0].collidelist(changed) >= 0)
+        if redraw_overlay:
+            overlay_rects = [state[0] for state in (self.drawn_overlay, our_overlay) if state is not None]
+            erased.extend(overlay_rects)
+            changed.extend(overlay_rects)
+        redraw_score = text is not self.drawn_score[1] or score_rect.collidelist(changed) >= 0
+        if redraw_score: erased.extend([self.drawn_score[0], score_rect])
+
+        for rect in erased: dis.blit(self.background, rect, rect)
+
+        # food layer
+        redraw_food = our_food is not None and (our_food != self.drawn_food or our_food[0].collidelist(erased) >= 0)
+        if redraw_food: pygame.draw.rect(dis, our_food[1], our_food[0])
+
+        # snake layer: every cell erased or entered, and the food cell if the food was drawn over it
+        for rect in erased: self.draw_snake_cells(rect, head)
+        if redraw_food: self.draw_snake_cells(our_food[0], head)
+        drawn = list(erased)
+        if redraw_food: drawn.append(our_food[0])
+
+        # sprites layer (the head then the cops), drawn again when they moved or something was drawn over them
+        for rect, color in our_sprites:
+            if sprite_key((rect, color)) in moved_keys or rect.collidelist(drawn) >= 0:
+                pygame.draw.rect(dis, color, rect)
+                drawn.append(rect)
+
+        # score on top of everything
+        if redraw_score: dis.blit(text, score_rect)
+        if redraw_overlay and our_overlay is not None: dis.blit(our_overlay[1], our_overlay[0])
+
+        if profiler is not None: profiler.mark("render")
+        pygame.display.update(drawn)
+        if profiler is not None: profiler.mark("display")
+
+class world_renderer(renderer):
+    """
+    class responsible for drawing a game of a large world, through a camera following the snake's head
+    every frame the chunks under the screen are blitted (each one rasterized once, see chunked_grid.surface), then
+    the food, the squares of the body, the cops and the score that lie on the screen, so that the cost of a frame
+    depends on the screen and not on the size of the world; the camera moving every tick, the whole screen is drawn
+    """
 
-        # eaten food handler
-        if our_snake.x_coord == our_food.x_coord and our_snake.y_coord == our_food.y_coord:      
-            our_snake.ate_food(our_food.foodtype)
-            if our_food.foodtype == 'fast': our_food.snake_speed *= fasterMultiplier
+    def __init__(self, our_game):
+        self.game = our_game
+        self.world = our_game.obstacles
+
+    def camera(self, our_sprites):
+        # top left corner of the screen in the world, the interpolated head being kept in its middle
+        head = our_sprites[0][0] if our_sprites else pygame.Rect(self.game.snake.x_coord, self.game.snake.y_coord, snake_block, snake_block)
+        return head.centerx - dis_width // 2, head.centery - dis_height // 2
+
+    def on_screen(self, x_coord, y_coord, left, top):
+        # screen position of a world position, None when it lies out of the screen (the world wrapping around)
+        x_screen = (x_coord - left) % self.world.width
+        y_screen = (y_coord - top) % self.world.height
+        if x_screen > self.world.width - snake_block: x_screen -= self.world.width
+        if y_screen > self.world.height - snake_block: y_screen -= self.world.height
+        if x_screen >= dis_width or y_screen >= dis_height: return None
+        return x_screen, y_screen
+
+    def draw(self, alpha=1.0):
+        our_sprites = self.sprites(alpha)
+        our_overlay = self.overlay_state()
+        left, top = self.camera(our_sprites)
+        self.world.prefetch(left, top)
+
+        # obstacles layer, from the chunks under the screen
+        for column in range(left // dis_width, (left + dis_width - 1) // dis_width + 1):
+            for row in range(top // dis_height, (top + dis_height - 1) // dis_height + 1):
+                dis.blit(self.world.surface(column, row), (column * dis_width - left, row * dis_height - top))
+
+        our_food = self.food_state()
+        if our_food is not None:
+            position = self.on_screen(our_food[0].x, our_food[0].y, left, top)
+            if position is not None: pygame.draw.rect(dis, our_food[1], [position[0], position[1], snake_block, snake_block])
+
+        # the body without its head, then the sprites
+        body = self.game.snake.surface.array()[:-1]
+        x_screens = (body[:, 0] - left) % self.world.width
+        y_screens = (body[:, 1] - top) % self.world.height
+        x_screens = np.where(x_screens > self.world.width - snake_block, x_screens - self.world.width, x_screens)
+        y_screens = np.where(y_screens > self.world.height - snake_block, y_screens - self.world.height, y_screens)
+        visible = (x_screens < dis_width) & (y_screens < dis_height)
+        for x_coord, y_coord in zip(x_screens[visible].tolist(), y_screens[visible].tolist()):
+            pygame.draw.rect(dis, self.game.snake.color, [x_coord, y_coord, snake_block, snake_block])
+        for rect, color in our_sprites:
+            position = self.on_screen(rect.x, rect.y, left, top)
+            if position is not None: pygame.draw.rect(dis, color, [position[0], position[1], snake_block, snake_block])
+
+        score_rect, text = self.score_state()
+        dis.blit(text, score_rect)
+        if our_overlay is not None: dis.blit(our_overlay[1], our_overlay[0])
+
+        if profiler is not None: profiler.mark("render")
+        pygame.display.update()
+        if profiler is not None: profiler.mark("display")
+
+def new_renderer(our_game, mode):
+    """
+    prints the obstacles of the game and returns the renderer drawing its frames
+    on the single screen board the obstacles are printed once on a background surface copied by the renderer, the same
+    surface being used for every game, or the prepared background of the cached level is copied as is when there is one
+    """
+
+    if our_game.world is not None: return world_renderer(our_game)
+    if our_game.level is not None: return renderer(our_game, our_game.level.surface(), mode=mode)
+    global background_surface
+    if background_surface is None: background_surface = pygame.Surface((dis_width, dis_height))
+    background_surface.fill(black)
+    our_game.obstacles.print_pattern(background_surface)
+    return renderer(our_game, background_surface, mode=mode)
+
+class scheduler():
+    """
+    class responsible for the pace of the game, with a fixed timestep
+    the simulation advances by whole ticks of 1 / tick_rate seconds measured with perf_counter, independently from
+    the frames, which are drawn at the refresh rate of the display with the fraction of the tick elapsed (alpha)
+    when a frame took too long, the ticks due are run back to back before the next frame (frames are skipped) so that
+    a slow frame never slows the game down, up to max_ticks beyond which the late time is dropped
+    """
+
+    def __init__(self, tick_rate, max_ticks=5):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.last_time = time.perf_counter()
+        self.accumulated = 0.0
+
+    def set_tick_rate(self, tick_rate):
+        self.tick_rate = tick_rate
+
+    def due_ticks(self):
+        now = time.perf_counter()
+        self.accumulated += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulated * self.tick_rate)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulated = ticks / self.tick_rate
+
+        self.accumulated -= ticks / self.tick_rate
+        return ticks
+
+    def alpha(self):
+        return min(1.0, self.accumulated * self.tick_rate)
+
+class input_queue():
+    """
+    class responsible for the directions pressed by the player, applied one per tick
+    the key presses are timestamped and queued as they are polled, so that several presses between two ticks are applied
+    in turn on the next ticks instead of the last one only; a press repeating or reversing the direction the snake will
+    have by then is rejected (a reversal would only make it run into its neck), and the presses older than expiry seconds
+    are dropped when their tick comes, the player having moved on since
+    """
+
+    opposite = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+    def __init__(self, capacity=input_capacity, expiry=input_expiry):
+        self.capacity = capacity
+        self.expiry = expiry
+        self.commands = deque()
+
+    def push(self, action, heading, timestamp=None):
+        """
+        queues a direction pressed while the snake heads towards heading, returns whether it was kept
+        """
+
+        last = self.commands[-1][0] if self.commands else heading
+        if action == last or action == self.opposite.get(last) or len(self.commands) >= self.capacity: return False
+
+        self.commands.append((action, time.perf_counter() if timestamp is None else timestamp))
+        return True
+
+    def pop(self, heading, now=None):
+        # the direction to apply at this tick, None to keep going
+        now = time.perf_counter() if now is None else now
+        while self.commands:
+            action, timestamp = self.commands.popleft()
+            if now - timestamp <= self.expiry and action != heading and action != self.opposite.get(heading): return action
+
+        return None
+
+def refresh_rate():
+    # refresh rate of the screen, 60 frames per second when the driver does not tell
+    rates = pygame.display.get_desktop_refresh_rates() if hasattr(pygame.display, "get_desktop_refresh_rates") else []
+    return rates[0] if rates and rates[0] > 0 else 60
+
+def toggle_overlay():
+    # shows or hides the profiler's overlay, the profiler being started on the first use
+    global profiler
+
+    if profiler is None:
+        from profiler import frame_profiler
+        profiler = frame_profiler()
+    profiler.overlay = not profiler.overlay
+
+def save_trace():
+    if profiler is not None and trace_path is not None: profiler.export(trace_path)
+
+class game_scene():
+    """
+    scene of a game being played, running the game based on the selected difficulty and user action
+    handles the direction of the snake based on what key is pressed (if any is) and lets the game state apply the rules
+    comments are written along the way when judged necessary, so as to clearly grasp how the code is structured
+    """
+
+    def __init__(self, difficulty, police_chase=False):
+        self.police_chase = police_chase
+        self.inputs = input_queue()
+        self.quit = False
+        self.next_blink = 0
+
+        # initializes the game (snake, obstacles, food and police), on a level already built when they are cached
+        seed = cached_levels.take(difficulty) if cached_levels is not None and world_size is None else None
+        self.game = game_state(difficulty=difficulty, police_chase=police_chase, police_mode=police_mode, seed=seed, n_police=police_count, world_chunks=(world_size, world_size) if world_size is not None else None)
+
+        # we print the pattern at last and save it (so as to copy paste it at each future frame)
+        self.renderer = new_renderer(self.game, render_mode)
+        self.scheduler = scheduler(tick_rate=self.game.food.snake_speed)
+
+        # records the actions of the game if asked to
+        self.recorder = None
+        if record_path is not None:
+            from replay import recorder
+            self.recorder = recorder(self.game)
+
+        # streams the game if asked to
+        if stream_server is not None: stream_server.start_game(self.game)
+
+    def end(self):
+        # saves the replay and the trace of the game, and tells its end to the subscribers of the stream
+        if self.recorder is not None:
+            root, extension = os.path.splitext(record_path)
+            self.recorder.save(f"{root}-{self.game.seed}{extension}")
+        if stream_server is not None and self.game.game_close: stream_server.end_game(self.game)
+        save_trace()
+        self.game.close()
+
+    def handle(self, events):
+        # we queue the directions pressed by the user (if any), each of them moving the snake at a tick of its own
+        for event in events:
+            if event.type == stop: self.quit = True
+
+            if event.type == anykey:
+                if event.key == left: self.inputs.push("left", self.game.snake.direction())
+                elif event.key == right: self.inputs.push("right", self.game.snake.direction())
+                elif event.key == up: self.inputs.push("up", self.game.snake.direction())
+                elif event.key == down: self.inputs.push("down", self.game.snake.direction())
+                elif event.key == overlay_key: toggle_overlay()
+
+        # the actions sent by the subscribers of the stream are queued like the keys pressed
+        if stream_server is not None:
+            for action in stream_server.actions(): self.inputs.push(action, self.game.snake.direction())
+
+    def poll(self):
+        self.handle(pygame.event.get())
+
+    def frame(self, events):
+        self.handle(events)
+        if self.quit:
+            self.end()
+            return None
+
+        if profiler is not None: profiler.mark("events")
+
+        # the game state applies the next direction queued and every rule of the game, once per tick due since the last frame
+        our_game = self.game
+        for tick in range(self.scheduler.due_ticks()):
+            action = self.inputs.pop(our_game.snake.direction())
+            if self.recorder is not None: self.recorder.record(our_game.ticks, action)
+            our_game.step(action)
+            if stream_server is not None: stream_server.publish(our_game)
 
-            # if the food is eaten, we generate a new one
-            our_food = food(snake_speed=our_food.snake_speed)
-            our_food.generate()
+            # blinking police light, its period counted in ticks
+            if self.police_chase and our_game.ticks >= self.next_blink:
+                our_game.police.blinking()
+                self.next_blink = our_game.ticks + max(1, round(blinking_period * our_game.food.snake_speed))
 
-        clock.tick(our_food.snake_speed)
+            if our_game.game_close: break
+
+        self.scheduler.set_tick_rate(our_game.food.snake_speed)
+
+        # draws the food, the snake, the cop (if the game mode is selected) and the score over the obstacles background
+        self.renderer.draw(alpha=self.scheduler.alpha())
+
+        # if the game is lost we save its replay and go to the loss screen
+        if our_game.game_close:
+            self.end()
+            return loss_scene(our_game.snake.length)
+
+        return self
+
+class loss_scene():
+    """
+    scene shown when the game is lost, Q quitting the game and C going back to the menu
+    the screen does not change, so it is only drawn once
+    """
+
+    def __init__(self, snake_length):
+        self.snake_length = snake_length
+        self.drawn = False
+
+    def frame(self, events):
+        for event in events:
+            if event.type == stop: return None
+            if event.type == anykey:
+                if event.key == q: return None
+                if event.key == c: return menu_scene()
+
+        if not self.drawn:
+            close_game(self.snake_length)
+            self.drawn = True
+
+        return self
+
+class menu_scene():
+    """
+    scene of the menu, where clicking a button starts a game with its difficulty and mode
+    """
+
+    # text, position, size, colors and (difficulty, police chase) of every button
+    buttons = [('Easy', 150, 250, 150, 50, dark_green, bright_green, ('easy', False)),
+               ('Medium', 325, 250, 150, 50, blue, bright_blue, ('medium', False)),
+               ('Hard', 500, 250, 150, 50, red, bright_red, ('hard', False)),
+               ('Police chase', 675, 250, 200, 50, bright_blue, bright_red, ('medium', True))]
+
+    def frame(self, events):
+        for event in events:
+            if event.type == stop: return None
+
+        dis.fill(black)
+        chosen = None
+        for button_text, x, y, w, h, inactive_color, active_color, choice in self.buttons:
+            if draw_button(button_text, x, y, w, h, inactive_color, active_color): chosen = choice
+
+        pygame.display.update()
+        if chosen is not None: return game_scene(*chosen)
+        return self
+
+def idle(scene, deadline):
+    """
+    waits for the end of the frame, a game polling the keyboard every input_poll_period seconds in the meantime so that
+    the presses are queued in the order and at the time they happen, ready for the ticks of the next frame
+    """
+
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0: return
+        if isinstance(scene, game_scene): scene.poll()
+        time.sleep(min(input_poll_period, remaining))
+
+def run_scenes(scene):
+    """
+    single loop of the rendered game: every frame the current scene (menu, game or loss screen) handles the events and
+    draws itself, then returns the scene of the next frame (itself, another one, or None to quit)
+    a scene left is simply dropped, so that nothing piles up on the stack nor in memory however many games are played,
+    the display, the fonts and the background surface being the same for all of them, and the buffers of the levels
+    being reused from a game to the next (see game_state.close)
+    """
+
+    frame_rate = refresh_rate()
+    while scene is not None:
+        frame_start = time.perf_counter()
+        timed = profiler is not None and isinstance(scene, game_scene)
+        if timed: profiler.frame_start()
+
+        next_scene = scene.frame(pygame.event.get())
+        idle(next_scene, frame_start + 1 / frame_rate)
+
+        if timed:
+            profiler.mark("idle")
+            profiler.frame_end()
+        scene = next_scene
 
     pygame.quit()
-    quit()
 
-# creates the buttons
-def draw_button(button_text, x, y, w, h, inactive_color, active_color, action):
+# creates the buttons, telling whether they are clicked
+def draw_button(button_text, x, y, w, h, inactive_color, active_color):
     mouse = pygame.mouse.get_pos()
     click = pygame.mouse.get_pressed()
+    clicked = False
 
     # if the mouse is hovering the box
     if x+w > mouse[0] > x and y+h > mouse[1] > y:
         pygame.draw.rect(dis, active_color, (x, y, w, h))
 
         # if the mouse is clicking the box
-        if click[0] == 1 and action is not None:
-            action()         
+        if click[0] == 1: clicked = True
     else:
         pygame.draw.rect(dis, inactive_color, (x, y, w, h))
 
-    text_surf = font_style.render(button_text, True, black)
+    text_surf = render_text(button_text, black)
     text_rect = text_surf.get_rect()
     text_rect.center = ((x+(w/2)), (y+(h/2)))
     dis.blit(text_surf, text_rect)
+    return clicked
 
 # displays the score
 def scoring_update(score):
-    value = font_style.render("Your Score: " + str(score), True, white)
+    value = render_text("Your Score: " + str(score), white)
     dis.blit(value, [0, 0])
 
 # displays messages
 def message(msg, color):
-    mesg = font_style.render(msg, True, color)
+    mesg = render_text(msg, color)
     dis.blit(mesg, [dis_width / 3, dis_height / 2])
 
-# easy difficulty setter
-def set_easy():
-    game_loop(difficulty='easy')
-
-# medium difficulty setter
-def set_medium():
-    game_loop(difficulty='medium')
-
-# hard difficulty setter
-def set_hard():
-    game_loop(difficulty='hard')
-
-    # hard difficulty setter
-
-# police chase mode setter
-def set_police():
-    game_loop(difficulty='medium', police_chase=True)
-
-# handle quitting the menu
-def quit_menu():
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
 # menu when game is lost
 def close_game(snake_length):
     dis.fill(black)
@@ -582,19 +2571,55 @@ def close_game(snake_length):
     scoring_update(snake_length - 1)
     pygame.display.update()
 
-# launch the menu
-def main_menu():
-    menu_active = True
-    while menu_active:
-        quit_menu()
-
-        dis.fill(black)
-        draw_button('Easy', 150, 250, 150, 50, dark_green, bright_green, set_easy)
-        draw_button('Medium', 325, 250, 150, 50, blue, bright_blue, set_medium)
-        draw_button('Hard', 500, 250, 150, 50, red, bright_red, set_hard)
-        draw_button('Police chase', 675, 250, 200, 50, bright_blue, bright_red, set_police)
-
-        pygame.display.update()
+def cops_count(text):
+    # type of the --cops options (here and in tournament.py), a game needing at least one cop
+    count = int(text)
+    if count < 1: raise argparse.ArgumentTypeError(f"the number of cops must be at least 1, not {count}")
+    return count
 
 # run the game
-main_menu()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enhanced Snake Game")
+    parser.add_argument("--headless", action="store_true", help="simulate one game without display nor frame cap and print its throughput")
+    parser.add_argument("--difficulty", choices=list(speed.keys()), default="medium")
+    parser.add_argument("--police", action="store_true", help="enable the police chase in headless mode")
+    parser.add_argument("--police-mode", choices=police_modes, default=police_mode, help="how the cop heads for the snake")
+    parser.add_argument("--cops", type=cops_count, default=police_count, help="number of cops chasing the snake (a swarm when more than one)")
+    parser.add_argument("--world", type=int, default=None, choices=range(1, max_world_size + 1), metavar="N", help="play in a large world of N x N screens")
+    parser.add_argument("--render", choices=render_modes, default=render_mode, help="redraw only what changed (dirty) or the whole screen (full) every frame")
+    parser.add_argument("--ticks", type=int, default=10000, help="maximum number of ticks simulated in headless mode")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the headless game")
+    parser.add_argument("--record", default=None, help="file where the replays of the games played are written, each one suffixed with the seed of its game")
+    parser.add_argument("--profile", action="store_true", help="time the phases of every frame and show them in an overlay (toggled with F3)")
+    parser.add_argument("--trace", default=None, help="file where the trace of the frames is written, as CSV or as a Chrome trace (.json)")
+    parser.add_argument("--level-cache", default=default_level_directory, help="directory where the levels are cached")
+    parser.add_argument("--no-level-cache", action="store_true", help="build every level when its game starts, without caching them")
+    parser.add_argument("--serve", default=None, metavar="ADDRESS", help="stream the games on a port, host:port or Unix domain socket path (see server.py)")
+    args = parser.parse_args()
+    if args.world is not None and (args.cops > 1 or args.police_mode != "greedy"):
+        parser.error("--world only has the single greedy cop: the swarm (--cops) and the pathfinding cop need the whole board")
+
+    if args.headless:
+        our_game, ticks_per_second = run_headless(difficulty=args.difficulty, police_chase=args.police, max_ticks=args.ticks, police_mode=args.police_mode, seed=args.seed, n_police=args.cops, world_chunks=(args.world, args.world) if args.world is not None else None)
+        print(f"seed {our_game.seed}, {our_game.ticks} ticks, score {our_game.score()}, {'lost' if our_game.game_close else 'alive'}, {ticks_per_second:.0f} ticks/s")
+    else:
+        render_mode = args.render
+        police_count = args.cops
+        police_mode = args.police_mode
+        world_size = args.world
+        record_path = args.record
+        trace_path = args.trace
+        if args.profile or args.trace is not None:
+            from profiler import frame_profiler
+            profiler = frame_profiler(tracing=args.trace is not None)
+            profiler.overlay = args.profile
+        if args.serve is not None:
+            from server import state_server, parse_address
+            stream_server = state_server(parse_address(args.serve))
+        init_display()
+        if not args.no_level_cache:
+            cached_levels = level_cache(directory=args.level_cache)
+            cached_levels.start()
+        try: run_scenes(menu_scene())
+        finally:
+            if stream_server is not None: stream_server.close()
\ No newline at end of file
@@ -0,0 +1,132 @@
+# library initialization
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+
+import snake
+
+# parameters that can be swept, with the type of their values: the grid format of the difficulty played, the speed of
+# the cop and the share of its moves heading straight for the snake
+# the speed of the snake is not one of them: the games advance one cell per tick whatever their speed, and the bots
+# react at every tick, so the speed would only turn the same games into other durations in seconds
+sweepable = {"grid": int, "turbo": float, "best": float}
+bots = {"random": snake.random_policy, "cautious": snake.cautious_policy, "seeking": snake.seeking_policy}
+default_games = 200
+default_ticks = 20000 # a game still going after that many ticks is stopped and counted as alive
+tournament_seed = 2023
+
+# hand-picked values, restored before every game so that a worker never keeps the settings of a previous one
+default_grid = dict(snake.init_grid_format)
+default_turbo = snake.police_turbo
+
+def apply_settings(difficulty, settings):
+    snake.init_grid_format.update(default_grid)
+    snake.police_turbo = settings.get("turbo", default_turbo)
+    if "grid" in settings: snake.init_grid_format[difficulty] = settings["grid"]
+
+def play(task):
+    """
+    plays one headless game of the tournament with the settings given, in a worker process
+    """
+
+    config, game, seed, settings, options = task
+    apply_settings(options["difficulty"], settings)
+    policy = bots[options["bot"]](seed)
+    our_game, ticks_per_second = snake.run_headless(difficulty=options["difficulty"], police_chase=options["police_chase"], max_ticks=options["max_ticks"],
+                                                    policy=policy, police_mode=options["police_mode"], seed=seed, n_police=options["n_police"],
+                                                    best_ratio=settings.get("best", snake.police_best_move))
+    return config, game, {"seed": seed, "ticks": our_game.ticks, "score": our_game.score(), "cause": our_game.cause,
+                          "elapsed": our_game.ticks / ticks_per_second if ticks_per_second > 0 else 0.0}
+
+def percentiles(values):
+    if len(values) == 0: return None
+    return dict(zip(["p10", "p50", "p90"], np.percentile(values, [10, 50, 90]).round(2).tolist()))
+
+def summary(games, tick_rate):
+    """
+    aggregate statistics of the games of one configuration, times being given in ticks and in seconds of play at the
+    tick rate of the difficulty (the fast food boosts aside)
+    """
+
+    scores = np.array([game["score"] for game in games])
+    ticks = np.array([game["ticks"] for game in games])
+    captures = np.array([game["ticks"] for game in games if game["cause"] == "police"])
+    causes = {cause: sum(game["cause"] == cause for game in games) for cause in ["police", "obstacle", "tail", None]}
+    elapsed = sum(game["elapsed"] for game in games)
+
+    return {"games": len(games), "score_mean": round(float(scores.mean()), 2), "score": percentiles(scores), "score_max": int(scores.max()),
+            "score_histogram": np.bincount(scores).tolist(), "survival_ticks": percentiles(ticks), "survival_seconds": percentiles(ticks / tick_rate),
+            "capture_rate": round(causes["police"] / len(games), 3), "capture_ticks": percentiles(captures),
+            "capture_seconds": percentiles(captures / tick_rate), "lost_to": {str(cause).lower(): count for cause, count in causes.items()},
+            "ticks_per_s": round(ticks.sum() / elapsed) if elapsed > 0 else None}
+
+def configurations(sweeps):
+    # every combination of the values swept, a single configuration with the hand-picked values when nothing is swept
+    names = list(sweeps)
+    return [dict(zip(names, values)) for values in itertools.product(*(sweeps[name] for name in names))]
+
+def run_tournament(options, sweeps=None, n_games=default_games, seed=tournament_seed, processes=None):
+    """
+    plays n_games games per configuration across a pool of processes (one per core by default)
+    the seeds of the games are drawn from the tournament's seed and are the same for every configuration, so that
+    configurations are compared on the same levels and the whole tournament can be run again identically
+    returns the configurations along with the results of their games, in the order of the seeds
+    """
+
+    our_configurations = configurations(sweeps or {})
+    seeds_rng = random.Random(seed)
+    seeds = [seeds_rng.getrandbits(32) for game in range(n_games)]
+    tasks = [(config, game, game_seed, settings, options) for config, settings in enumerate(our_configurations) for game, game_seed in enumerate(seeds)]
+
+    results = [[None] * n_games for settings in our_configurations]
+    with multiprocessing.Pool(processes) as pool:
+        for config, game, result in pool.imap_unordered(play, tasks, chunksize=max(1, len(tasks) // (4 * (processes or multiprocessing.cpu_count())))):
+            results[config][game] = result
+
+    return our_configurations, results
+
+def parse_sweep(text):
+    name, separator, values = text.partition("=")
+    if name not in sweepable or not separator: raise argparse.ArgumentTypeError(f"expected name=value,value,... with name among {', '.join(sweepable)}")
+    try: return name, [sweepable[name](value) for value in values.split(",")]
+    except ValueError: raise argparse.ArgumentTypeError(f"invalid values for {name}: {values}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays many headless games with a scripted bot, in parallel, and reports their statistics")
+    parser.add_argument("--games", type=int, default=default_games, help="number of games per configuration")
+    parser.add_argument("--difficulty", choices=list(snake.speed.keys()), default="medium")
+    parser.add_argument("--police", action="store_true", help="enable the police chase")
+    parser.add_argument("--police-mode", choices=snake.police_modes, default="greedy", help="how the cops head for the snake")
+    parser.add_argument("--cops", type=snake.cops_count, default=1, help="number of cops chasing the snake")
+    parser.add_argument("--bot", choices=list(bots), default="seeking", help="scripted driver of the snake")
+    parser.add_argument("--ticks", type=int, default=default_ticks, help="maximum number of ticks of a game")
+    parser.add_argument("--seed", type=int, default=tournament_seed, help="seed the seeds of the games are drawn from")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (one per core by default)")
+    parser.add_argument("--sweep", type=parse_sweep, action="append", default=[], metavar="NAME=V1,V2,...",
+                        help=f"values of a parameter to try ({', '.join(sweepable)}), every combination of the sweeps being played")
+    parser.add_argument("--output", default=None, help="JSON file where the statistics and the games are written")
+    args = parser.parse_args()
+
+    options = {"difficulty": args.difficulty, "police_chase": args.police, "police_mode": args.police_mode, "n_police": args.cops, "bot": args.bot, "max_ticks": args.ticks}
+    start = time.perf_counter()
+    our_configurations, results = run_tournament(options, sweeps=dict(args.sweep), n_games=args.games, seed=args.seed, processes=args.processes)
+    elapsed = time.perf_counter() - start
+
+    report = []
+    for settings, games in zip(our_configurations, results):
+        stats = summary(games, snake.speed[args.difficulty])
+        report.append({"settings": settings, "summary": stats, "games": games})
+        name = ", ".join(f"{key}={value}" for key, value in settings.items()) or "hand-picked values"
+        capture = f", capture p50 {stats['capture_seconds']['p50']:.1f}s" if stats["capture_ticks"] is not None else ""
+        print(f"{name:40} score mean {stats['score_mean']:6.2f} p50 {stats['score']['p50']:5.1f} p90 {stats['score']['p90']:5.1f} max {stats['score_max']:4}, "
+              f"survival p50 {stats['survival_seconds']['p50']:6.1f}s, captured {stats['capture_rate']:5.1%}{capture}, {stats['ticks_per_s']} ticks/s")
+
+    total_ticks = sum(game["ticks"] for games in results for game in games)
+    print(f"{len(our_configurations) * args.games} games, {total_ticks} ticks in {elapsed:.1f}s ({total_ticks / elapsed:.0f} ticks/s over every process)")
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file: json.dump({"options": options, "seed": args.seed, "configurations": report}, output_file, indent=2)